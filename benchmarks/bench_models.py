@@ -0,0 +1,177 @@
+# Throughput benchmark for every enhancer model
+# Times enhance_frame stage by stage on synthetic frames (or frames from
+# FFmpeg's testsrc2) at 720p/1080p/1440p/4K and writes JSON that can be
+# compared across commits. Each model/resolution pair runs in its own
+# interpreter so peak RSS is per case.
+#
+#   python benchmarks/bench_models.py --out before.json
+#   python benchmarks/bench_models.py --models lite_restore pro_detail --res 720p 1080p --frames 10
+#   python benchmarks/bench_models.py --source testsrc --out after.json
+#   python benchmarks/bench_models.py --source testsrc --temporal 1 --out temporal.json
+#   python benchmarks/bench_models.py --compare before.json after.json --threshold 10
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+
+from bench_scale_order import MODELS, peak_rss_mb, synthetic_frame
+
+RESOLUTIONS = {
+    "720p":  (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k":    (3840, 2160),
+}
+
+
+def testsrc_frames(w, h, count, ffmpeg_path):
+    # A few frames of moving test pattern, decoded straight to BGR
+    import numpy as np
+    cmd = [ffmpeg_path, "-v", "error", "-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate=30",
+           "-frames:v", str(count), "-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+    raw = subprocess.check_output(cmd)
+    frames = np.frombuffer(raw, dtype=np.uint8).reshape(-1, h, w, 3)
+    return [f.copy() for f in frames]
+
+
+def percentiles(values):
+    import numpy as np
+    a = np.asarray(values) * 1000
+    return {"mean": float(a.mean()), "p50": float(np.percentile(a, 50)), "p90": float(np.percentile(a, 90)),
+            "p99": float(np.percentile(a, 99)), "min": float(a.min()), "max": float(a.max())}
+
+
+def run_case(model, res, frames, warmup, source, temporal=0):
+    import importlib
+    import cv2
+
+    w, h = RESOLUTIONS[res]
+    module, cls = MODELS[model]
+    enhancer = getattr(importlib.import_module(module), cls)(temporal=temporal)
+    if source == "testsrc":
+        from core.ffmpeg_tools import get_ffmpeg_path
+        inputs = testsrc_frames(w, h, min(frames, 30), get_ffmpeg_path())
+    else:
+        inputs = [synthetic_frame(w, h, seed) for seed in range(min(frames, 4))]
+    base_rss = peak_rss_mb()
+
+    # enhance_frame, one stage at a time
+    stages = enhancer.pre_scale_stages() + enhancer.post_scale_stages()
+    stage_times = {name: [] for name, _, _ in stages}
+    latencies = []
+    for i in range(warmup + frames):
+        frame = inputs[i % len(inputs)]
+        t0 = time.perf_counter()
+        for name, fn, _ in stages:
+            t = time.perf_counter()
+            frame = fn(frame)
+            if i >= warmup:
+                stage_times[name].append(time.perf_counter() - t)
+        out = enhancer._deliver(frame, None)
+        if i >= warmup:
+            latencies.append(time.perf_counter() - t0)
+        assert out.shape == (h, w, 3)
+
+    total = sum(latencies)
+    return {
+        "model": model, "resolution": res, "width": w, "height": h, "frames": frames, "source": source,
+        "temporal": temporal,
+        "fps": frames / total if total else 0.0,
+        "latency_ms": percentiles(latencies),
+        "stages_ms": {name: percentiles(t) for name, t in stage_times.items()},
+        "peak_rss_mb": peak_rss_mb(), "baseline_rss_mb": base_rss,
+        "cv2_threads": cv2.getNumThreads(),
+    }
+
+
+def environment():
+    import cv2
+    import numpy as np
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "platform": platform.platform(), "cpu_count": os.cpu_count(), "opencv": cv2.__version__,
+            "numpy": np.__version__}
+
+
+def compare(old_path, new_path, threshold):
+    with open(old_path) as f:
+        old = {(r["model"], r["resolution"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'model':<15}{'res':<7}{'old fps':>9}{'new fps':>9}{'change':>9}{'p90 ms':>10}")
+    for r in new:
+        before = old.get((r["model"], r["resolution"]))
+        if before is None or not before["fps"]:
+            continue
+        change = (r["fps"] - before["fps"]) / before["fps"] * 100
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{r['model']:<15}{r['resolution']:<7}{before['fps']:>9.2f}{r['fps']:>9.2f}{change:>+8.1f}%"
+              f"{r['latency_ms']['p90']:>10.1f}{flag}")
+        for name, t in r["stages_ms"].items():
+            prev = before["stages_ms"].get(name)
+            if prev and prev["mean"]:
+                print(f"    {name:<22}{prev['mean']:>8.1f} -> {t['mean']:.1f} ms")
+    return 1 if regressions else 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark enhancer models per stage")
+    ap.add_argument("--models", nargs="+", default=sorted(MODELS), choices=sorted(MODELS))
+    ap.add_argument("--res", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    ap.add_argument("--frames", type=int, default=5)
+    ap.add_argument("--warmup", type=int, default=1)
+    ap.add_argument("--source", default="synthetic", choices=["synthetic", "testsrc"])
+    ap.add_argument("--temporal", type=int, default=0, help="previous frames for temporal denoising")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    ap.add_argument("--threshold", type=float, default=10, help="fps drop (%%) reported as a regression")
+    ap.add_argument("--case", nargs=2, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    if args.case:
+        print(json.dumps(run_case(args.case[0], args.case[1], args.frames, args.warmup, args.source, args.temporal)))
+        return
+
+    results = []
+    print(f"{'model':<15}{'res':<7}{'fps':>8}{'p50 ms':>10}{'p99 ms':>10}{'peak MB':>10}  slowest stage")
+    for model in args.models:
+        for res in args.res:
+            out = subprocess.check_output([
+                sys.executable, os.path.abspath(__file__), "--case", model, res,
+                "--frames", str(args.frames), "--warmup", str(args.warmup), "--source", args.source,
+                "--temporal", str(args.temporal)
+            ])
+            r = json.loads(out.decode().strip().splitlines()[-1])
+            results.append(r)
+            slowest = max(r["stages_ms"].items(), key=lambda kv: kv[1]["mean"])
+            print(f"{model:<15}{res:<7}{r['fps']:>8.2f}{r['latency_ms']['p50']:>10.1f}"
+                  f"{r['latency_ms']['p99']:>10.1f}{r['peak_rss_mb']:>10.1f}  "
+                  f"{slowest[0]} {slowest[1]['mean']:.1f} ms", flush=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=1)
+        print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Denoise-before-upscale benchmark
+# Compares the old image export order (Lanczos upscale -> full enhance_frame)
+# against process() (pre-scale stages at source size -> upscale -> post-scale).
+# Each variant runs in its own interpreter so peak RSS is not shared.
+#
+#   python benchmarks/bench_scale_order.py
+#   python benchmarks/bench_scale_order.py --model lite_restore --src 1920x1080 --dst 3840x2160
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODELS = {
+    "image_enhance": ("models.image_enhance", "ImageEnhanceModel"),
+    "lite_restore":  ("models.lite_restore", "LiteRestoreEnhancer"),
+    "pro_detail":    ("models.pro_detail", "ProDetailEnhancer"),
+    "ultra_native":  ("models.ultra_native", "UltraNativeEnhancer"),
+}
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def synthetic_frame(w, h, seed=0):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    base = np.stack([x / w * 255, y / h * 255, (x + y) / (w + h) * 255], axis=-1)
+    base += 40 * np.sin(x / 23.0)[..., None] * np.cos(y / 17.0)[..., None]
+    base += rng.normal(0, 12, base.shape)
+    return np.clip(base, 0, 255).astype(np.uint8)
+
+
+def run_variant(variant, model, src, dst, repeat):
+    import importlib
+    import cv2
+
+    module, cls = MODELS[model]
+    enhancer = getattr(importlib.import_module(module), cls)()
+    frame = synthetic_frame(*src)
+    base_rss = peak_rss_mb()
+
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        if variant == "upscale_first":
+            up = cv2.resize(frame, dst, interpolation=cv2.INTER_LANCZOS4)
+            out = enhancer.enhance_frame(up)
+        else:
+            out = enhancer.process(frame, dst)
+        times.append(time.perf_counter() - t)
+        assert out.shape[:2] == (dst[1], dst[0])
+
+    return {"variant": variant, "seconds": min(times), "peak_rss_mb": peak_rss_mb(),
+            "baseline_rss_mb": base_rss}
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark denoise-before-upscale ordering")
+    ap.add_argument("--model", default="image_enhance", choices=sorted(MODELS))
+    ap.add_argument("--src", default="1920x1080", type=parse_size)
+    ap.add_argument("--dst", default="3840x2160", type=parse_size)
+    ap.add_argument("--repeat", default=1, type=int)
+    ap.add_argument("--variant", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.model, args.src, args.dst, args.repeat)))
+        return
+
+    results = {}
+    for variant in ("upscale_first", "denoise_first"):
+        out = subprocess.check_output([
+            sys.executable, os.path.abspath(__file__), "--variant", variant, "--model", args.model,
+            "--src", "x".join(map(str, args.src)), "--dst", "x".join(map(str, args.dst)),
+            "--repeat", str(args.repeat)
+        ])
+        results[variant] = json.loads(out.decode().strip().splitlines()[-1])
+
+    old, new = results["upscale_first"], results["denoise_first"]
+    print(f"{args.model}: {args.src[0]}x{args.src[1]} -> {args.dst[0]}x{args.dst[1]}")
+    print(f"{'variant':<16}{'wall (s)':>10}{'peak RSS (MB)':>16}")
+    for r in (old, new):
+        print(f"{r['variant']:<16}{r['seconds']:>10.2f}{r['peak_rss_mb']:>16.1f}")
+    print(f"speed-up: {old['seconds'] / new['seconds']:.2f}x, "
+          f"peak RSS saved: {old['peak_rss_mb'] - new['peak_rss_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# Cold-start benchmark for the app and the command line
+# Imports each entry module in a fresh interpreter under -X importtime and
+# records the median wall time, the cumulative import time, the slowest
+# top-level imports and whether any of the heavy modules (OpenCV, NumPy,
+# psutil) were pulled in before the window could appear.
+#
+#   python benchmarks/bench_startup.py --out before.json
+#   python benchmarks/bench_startup.py --runs 9 --top 15
+#   python benchmarks/bench_startup.py --compare before.json after.json --threshold 15
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(ROOT)
+
+TARGETS = {
+    "app": "main",
+    "cli": "core.__main__",
+    "processing": "core.processing",
+}
+HEAVY = ("cv2", "numpy", "psutil")
+
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package" lines -> {module: (self, cumulative, depth)}
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(parts[0]), int(parts[1]), depth)
+    return modules
+
+
+def run_once(module):
+    code = f"import sys, time; t = time.perf_counter(); import {module}; " \
+           f"print(time.perf_counter() - t); print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    t = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO,
+                          capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - t
+    import_s, heavy = proc.stdout.splitlines()[-2:]
+    return wall, float(import_s), [m for m in heavy.split(",") if m], parse_importtime(proc.stderr)
+
+
+def run_target(name, module, runs, top):
+    walls, imports, last = [], [], None
+    for _ in range(runs):
+        wall, import_s, heavy, modules = run_once(module)
+        walls.append(wall)
+        imports.append(import_s)
+        last = (heavy, modules)
+    heavy, modules = last
+    roots = sorted(((m, c) for m, (_, c, d) in modules.items() if d == 0), key=lambda kv: -kv[1])
+    return {
+        "target": name, "module": module, "runs": runs,
+        "interpreter_ms": statistics.median(walls) * 1000,
+        "import_ms": statistics.median(imports) * 1000,
+        "heavy_loaded": heavy,
+        "slowest_imports_ms": {m: c / 1000 for m, c in roots[:top]},
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "platform": platform.platform(), "cpu_count": os.cpu_count()}
+
+
+def compare(old_path, new_path, threshold):
+    with open(old_path) as f:
+        old = {r["target"]: r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'target':<12}{'old ms':>9}{'new ms':>9}{'change':>9}  heavy modules")
+    for r in new:
+        before = old.get(r["target"])
+        if before is None or not before["import_ms"]:
+            continue
+        change = (r["import_ms"] - before["import_ms"]) / before["import_ms"] * 100
+        added = sorted(set(r["heavy_loaded"]) - set(before["heavy_loaded"]))
+        flag = ""
+        if change > threshold or added:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{r['target']:<12}{before['import_ms']:>9.1f}{r['import_ms']:>9.1f}{change:>+8.1f}%  "
+              f"{', '.join(r['heavy_loaded']) or '-'}{' (new: ' + ', '.join(added) + ')' if added else ''}{flag}")
+    return 1 if regressions else 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark import time of the app and CLI entry points")
+    ap.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    ap.add_argument("--runs", type=int, default=5, help="fresh interpreters per target (median is kept)")
+    ap.add_argument("--top", type=int, default=10, help="slowest top-level imports to record")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    ap.add_argument("--threshold", type=float, default=15, help="import time increase (%%) reported as a regression")
+    args = ap.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    results = []
+    print(f"{'target':<12}{'import ms':>11}{'process ms':>12}  heavy modules / slowest imports")
+    for name in args.targets:
+        r = run_target(name, TARGETS[name], args.runs, args.top)
+        results.append(r)
+        slowest = ", ".join(f"{m} {ms:.0f}" for m, ms in list(r["slowest_imports_ms"].items())[:3])
+        print(f"{name:<12}{r['import_ms']:>11.1f}{r['interpreter_ms']:>12.1f}  "
+              f"{', '.join(r['heavy_loaded']) or '-'} / {slowest}", flush=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=1)
+        print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Pooled-vs-sequential parity check
+# Runs the same frames through enhancer.process one after another (the
+# single-worker export path) and through FramePool, for an upscale and a
+# downscale, and reports the largest pixel difference per frame. Temporal
+# models must match exactly: each worker rebuilds the history the
+# sequential path would have had. Exits non-zero on any difference.
+#
+#   python benchmarks/check_pool_parity.py
+#   python benchmarks/check_pool_parity.py --models lite_restore ultra_native --temporal 0 1 2 --frames 8
+
+import argparse
+import importlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_scale_order import MODELS, synthetic_frame
+
+CASES = {
+    "upscale":   ((128, 96), (256, 192)),
+    "downscale": ((128, 96), (64, 48)),
+}
+
+
+def run_case(model, temporal, src, dst, frames, workers):
+    import numpy as np
+    from core.frame_pool import FramePool
+
+    module, cls = MODELS[model]
+    enhancer = getattr(importlib.import_module(module), cls)(temporal=temporal)
+    inputs = [synthetic_frame(*src, seed) for seed in range(frames)]
+
+    enhancer.reset_temporal()
+    sequential = [enhancer.process(f, dst).copy() for f in inputs]
+    with FramePool(enhancer, (src[1], src[0], 3), (dst[1], dst[0], 3), workers=workers) as pool:
+        pooled = list(pool.imap(inputs))
+    return [int(np.abs(a.astype(np.int16) - b).max()) for a, b in zip(sequential, pooled)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check that pooled enhancement matches the sequential path")
+    ap.add_argument("--models", nargs="+", default=["lite_restore"], choices=sorted(MODELS))
+    ap.add_argument("--temporal", nargs="+", type=int, default=[0, 1])
+    ap.add_argument("--frames", type=int, default=6)
+    ap.add_argument("--workers", type=int, default=2)
+    args = ap.parse_args()
+
+    failures = 0
+    for model in args.models:
+        for temporal in args.temporal:
+            for name, (src, dst) in CASES.items():
+                diffs = run_case(model, temporal, src, dst, args.frames, args.workers)
+                ok = not any(diffs)
+                failures += not ok
+                print(f"{'OK  ' if ok else 'FAIL'} {model:<15}temporal={temporal} {name:<10}max diff per frame {diffs}",
+                      flush=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
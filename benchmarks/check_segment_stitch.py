@@ -0,0 +1,135 @@
+# Segmented export frame-identity check
+# Encodes a numbered test clip through SegmentedExport with a pass-through
+# enhancer and a lossless codec, then decodes the stitched file and checks
+# that every output frame is the source frame at the same position: no
+# duplicate at the start of a segment, no frame dropped at its end, and
+# the last source frame present, and that verify_output agrees. A plan with
+# a frame left out between two segments must be caught by verify_output.
+# Exits non-zero on any mismatch.
+#
+#   python benchmarks/check_segment_stitch.py
+#   python benchmarks/check_segment_stitch.py --frames 1000 --parallel 2 4 --gop 50
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZE = (160, 90)
+FPS = 25
+LOSSLESS = ["-c:v", "libx264rgb", "-qp", "0"]
+
+
+class Passthrough:
+    # The enhancer interface VideoPipeline uses, returning frames unchanged
+    timings = None
+    temporal = 0
+
+    def reset_temporal(self):
+        pass
+
+    def process(self, frame, size, out=None):
+        if out is None:
+            return frame.copy()
+        out[:] = frame
+        return out
+
+
+def make_source(ffmpeg_path, path, frames, gop):
+    subprocess.check_call([
+        ffmpeg_path, "-v", "error", "-y", "-f", "lavfi",
+        "-i", f"testsrc2=size={SIZE[0]}x{SIZE[1]}:rate={FPS}",
+        "-frames:v", str(frames), "-c:v", "libx264", "-g", str(gop), "-pix_fmt", "yuv420p", path
+    ])
+
+
+def decode_all(ffmpeg_path, path, size=SIZE):
+    import numpy as np
+    raw = subprocess.check_output([
+        ffmpeg_path, "-v", "error", "-i", path, "-map", "0:v:0", "-fps_mode", "passthrough",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-"
+    ])
+    return np.frombuffer(raw, dtype=np.uint8).reshape(-1, size[1], size[0], 3)
+
+
+def export(ffmpeg_path, src, size, fps, total, segments, workdir, name):
+    from core.segments import SegmentedExport, verify_output
+
+    dst = os.path.join(workdir, f"out_{name}.mov")
+    job = SegmentedExport(ffmpeg_path, src, dst, Passthrough(), size, size, fps, total, segments,
+                          LOSSLESS, [], os.path.join(workdir, f"seg_{name}"), parallel=len(segments))
+    job.run()
+    return dst, job.frames_done, verify_output(src, dst, ffmpeg_path=ffmpeg_path, boundaries=job.boundaries())
+
+
+def run_case(ffmpeg_path, src, source, fps, parallel, keyframes, workdir):
+    from core.segments import plan_segments
+
+    total = len(source)
+    size = (source.shape[2], source.shape[1])
+    segments = plan_segments(total, fps, parallel, keyframes)
+    dst, done, problems = export(ffmpeg_path, src, size, fps, total, segments, workdir, parallel)
+    output = decode_all(ffmpeg_path, dst, size)
+    bad = [i for i in range(min(total, len(output))) if not (output[i] == source[i]).all()]
+    boundaries = [start for start, _ in segments[1:]]
+    return segments, len(output), done, bad, boundaries, problems
+
+
+def run_gap(ffmpeg_path, src, source, fps, workdir):
+    # The first segment stops one frame short of where the second starts
+    total = len(source)
+    size = (source.shape[2], source.shape[1])
+    half = total // 2
+    _, _, problems = export(ffmpeg_path, src, size, fps, total, [(0, half - 1), (half, 0)], workdir, "gap")
+    return problems
+
+
+def main():
+    from core.ffmpeg_tools import get_ffmpeg_path
+
+    ap = argparse.ArgumentParser(description="Check frame identity across segment boundaries")
+    ap.add_argument("--frames", type=int, default=1000)
+    ap.add_argument("--parallel", nargs="+", type=int, default=[2, 4])
+    ap.add_argument("--gop", type=int, default=50, help="keyframe interval of the test clip")
+    ap.add_argument("--source", help="check this video instead of a generated clip (split at its keyframes)")
+    args = ap.parse_args()
+
+    from core.frame_cache import KeyframeIndex
+    from core.media_probe import probe_media
+
+    ffmpeg_path = get_ffmpeg_path()
+    failures = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.source:
+            src = args.source
+            media = probe_media(src)
+            fps, size, keyframes = media.fps, (media.width, media.height), media.keyframes()
+        else:
+            src = os.path.join(workdir, "src.mp4")
+            make_source(ffmpeg_path, src, args.frames, args.gop)
+            fps, size, keyframes = FPS, SIZE, KeyframeIndex(range(0, args.frames, args.gop))
+        source = decode_all(ffmpeg_path, src, size)
+        for parallel in args.parallel:
+            segments, count, done, bad, boundaries, problems = run_case(ffmpeg_path, src, source, fps, parallel,
+                                                                        keyframes, workdir)
+            edges = [n for n in boundaries for n in (n - 1, n)] + [len(source) - 1]
+            bad_edges = sorted(set(bad) & set(edges))
+            ok = not bad and not problems and count == len(source) and done == len(source)
+            failures += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {len(segments)} segments starting at {[s for s, _ in segments]}: "
+                  f"{count}/{len(source)} frames out, {done} enhanced, {len(bad)} misaligned"
+                  f"{f' (at boundaries: {bad_edges})' if bad_edges else ''}"
+                  f"{f'; verify_output: {problems}' if problems else ''}", flush=True)
+        problems = run_gap(ffmpeg_path, src, source, fps, workdir)
+        failures += not problems
+        print(f"{'OK  ' if problems else 'FAIL'} frame left out between segments: "
+              f"verify_output {problems or 'found nothing'}", flush=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,9 @@ ICON_FILE   = "logo.ico"                    # Must exist in current folder
 MODELS_DIR  = "models"                      # Folder with enhancer modules
 FFMPEG_DIR  = "ffmpeg"                      # Folder with ffmpeg.exe + ffprobe.exe
 DIST_DIR    = r"F:\Own Apps\Installer\NotyUpscalerZAI"
+# One-folder build by default: a one-file exe unpacks OpenCV, NumPy and the
+# rest to a temp folder on every launch. Pass --onefile for a single exe.
+ONEFILE     = "--onefile" in sys.argv[1:]
 
 os.makedirs(DIST_DIR, exist_ok=True)
 
@@ -90,7 +93,7 @@ else:
 # ─────────────────────────────────────────────────────────────
 pyi_args = [
     SCRIPT,
-    "--onefile",
+    "--onefile" if ONEFILE else "--onedir",
     "--windowed",                   # No console window
     "--name=NotYUpscalerZAI",
     f"--icon={ICON_FILE}",
@@ -102,6 +105,7 @@ pyi_args = [
     "--hidden-import=cv2",
     "--hidden-import=customtkinter",
     "--hidden-import=PIL",
+    "--collect-submodules=models",  # enhancers are found by models.registry at runtime
     *add_data,                      # models + ffmpeg
     f"--distpath={DIST_DIR}",
     "--noconfirm",
@@ -141,7 +145,7 @@ for path in ["build", f"{SCRIPT.replace('.py', '')}.spec"]:
 # FINAL RESULT CHECK
 # ─────────────────────────────────────────────────────────────
 exe_name = "NotYUpscalerZAI.exe"
-exe_path = os.path.join(DIST_DIR, exe_name)
+exe_path = os.path.join(DIST_DIR, exe_name) if ONEFILE else os.path.join(DIST_DIR, "NotYUpscalerZAI", exe_name)
 
 print("\n" + "═" * 100)
 if os.path.isfile(exe_path):
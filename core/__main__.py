@@ -0,0 +1,199 @@
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Headless batch entry point:
+#   python -m core clip.mp4 "shots/*.png" renders/ --target 2k --jobs 2
+#   python -m core clip.mp4 --parity          # compare the two video engines, no export
+
+from core.ffmpeg_progress import format_eta
+from core.ffmpeg_tools import get_ffmpeg_path
+from core.processing import (ENGINES, ExportJob, ExportSettings, FORMAT_CODECS, IMAGE_MODEL, TARGETS,
+                             VIDEO_MODELS, calculate_size, is_media_path, is_video_path, load_model)
+
+
+def collect_inputs(patterns, recursive=False):
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                for root, _, files in os.walk(pattern):
+                    found += [os.path.join(root, f) for f in sorted(files)]
+            else:
+                found += [os.path.join(pattern, f) for f in sorted(os.listdir(pattern))]
+        elif glob.has_magic(pattern):
+            found += sorted(glob.glob(pattern, recursive=recursive))
+        else:
+            found.append(pattern)
+
+    seen, files = set(), []
+    for path in found:
+        key = os.path.abspath(path)
+        if key in seen or not os.path.isfile(path) or not is_media_path(path):
+            continue
+        if os.path.splitext(os.path.basename(path))[0].endswith("_enhanced"):
+            continue  # our own output from a previous run
+        seen.add(key)
+        files.append(path)
+    return files
+
+
+def parse_target(value):
+    value = value.strip()
+    for name in TARGETS:
+        if value.lower() in (name.lower(), name.split()[-1].lower()):
+            return name
+    raise argparse.ArgumentTypeError(f"unknown target {value!r} (choose from 2k, 3k, 4k)")
+
+
+def build_parser():
+    models = list(VIDEO_MODELS) + list(IMAGE_MODEL) + list(VIDEO_MODELS.values()) + list(IMAGE_MODEL.values())
+    ap = argparse.ArgumentParser(prog="python -m core", description="NotY Upscaler ZAI batch processor")
+    ap.add_argument("inputs", nargs="+", help="files, glob patterns or directories")
+    ap.add_argument("-r", "--recursive", action="store_true", help="descend into directories / allow ** globs")
+    ap.add_argument("-m", "--model", choices=models, default=None,
+                    help="video model (default Ultra Native); images always use Image Enhance")
+    ap.add_argument("-t", "--target", type=parse_target, default="Fit 4K", help="2k, 3k or 4k (default 4k)")
+    ap.add_argument("-b", "--bitrate", type=float, default=12, help="video bitrate in Mbps (default 12)")
+    ap.add_argument("-f", "--format", dest="fmt", choices=list(FORMAT_CODECS), default="mp4")
+    ap.add_argument("-s", "--sharpen", type=float, default=2.0)
+    ap.add_argument("-o", "--output", help="output folder (default: next to each input)")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="files processed concurrently")
+    ap.add_argument("-w", "--workers", type=int, default=0,
+                    help="enhancer processes per video job (default: CPU cores / jobs)")
+    ap.add_argument("--segments", type=int, default=0,
+                    help="split videos at keyframes and encode this many segments in parallel; "
+                         "finished segments are kept so an interrupted export resumes")
+    ap.add_argument("--temporal", type=int, default=0,
+                    help="denoise videos against this many previous frames (0 = every frame on its own)")
+    ap.add_argument("--skip-unchanged", type=float, default=0, metavar="LEVELS",
+                    help="reuse the previous output for video frames that changed by at most this many "
+                         "8-bit levels in any grid cell; below 1, only frames identical to the last enhanced "
+                         "one (default 0 = off)")
+    ap.add_argument("-e", "--engine", choices=sorted(set(ENGINES.values())), default="python",
+                    help="video engine: OpenCV stages (python) or the model's FFmpeg filter graph (ffmpeg)")
+    ap.add_argument("--parity", action="store_true",
+                    help="report PSNR/SSIM and speed of the FFmpeg graph against the OpenCV stages instead of exporting")
+    ap.add_argument("--timing", action="store_true", help="log wall time per enhancer stage after each file")
+    ap.add_argument("--memory-budget", type=int, default=None,
+                    help="tile working memory in MB (default 256)")
+    ap.add_argument("-q", "--quiet", action="store_true")
+    return ap
+
+
+class ConsoleReporter:
+    def __init__(self, total, quiet=False):
+        self.total = total
+        self.quiet = quiet
+        self._lock = threading.Lock()
+        self._last = {}
+
+    def line(self, text):
+        with self._lock:
+            print(text, flush=True)
+
+    def progress(self, index, name, done, total, fps):
+        if self.quiet:
+            return
+        now = time.monotonic()
+        if now - self._last.get(index, 0) < 2 and done != total:
+            return
+        self._last[index] = now
+        pct = f"{int(done / total * 100)}%" if total else f"{done} frames"
+        eta = f" ETA {format_eta((total - done) / fps)}" if total and fps else ""
+        self.line(f"[{index}/{self.total}] {name}: {pct} {fps:.1f} fps{eta}")
+
+
+def run_parity(files, settings):
+    videos = [f for f in files if is_video_path(f)]
+    if not videos:
+        print("--parity needs at least one video.", file=sys.stderr)
+        return 2
+    from core.media_probe import probe_media
+    from core.parity import format_report, parity_report
+
+    ffmpeg_path = get_ffmpeg_path()
+    failures = 0
+    for path in videos:
+        try:
+            media = probe_media(path)
+            model = load_model(settings.model_for(True), True, settings.sharpen, settings.temporal)
+            out_size = calculate_size(media.width, media.height, settings.target)
+            report = parity_report(ffmpeg_path, path, model, media, out_size,
+                                   threads=settings.threads or os.cpu_count() or 1)
+        except Exception as e:
+            failures += 1
+            print(f"FAIL {path}: {e}")
+            continue
+        print(f"{path} ({settings.model_for(True)}, {out_size[0]}x{out_size[1]})")
+        for line in format_report(report):
+            print("  " + line)
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    files = collect_inputs(args.inputs, args.recursive)
+    if not files:
+        print("No media files found.", file=sys.stderr)
+        return 2
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    jobs = max(1, args.jobs)
+    workers = args.workers or max(1, (os.cpu_count() or 1) // jobs)
+    settings = ExportSettings(model=args.model, target=args.target, bitrate=args.bitrate, fmt=args.fmt,
+                              sharpen=args.sharpen, workers=workers, memory_budget_mb=args.memory_budget,
+                              output_folder=args.output, segments=args.segments, timing=args.timing,
+                              temporal=max(0, args.temporal), skip_threshold=max(0.0, args.skip_unchanged),
+                              engine=args.engine)
+    if args.parity:
+        return run_parity(files, settings)
+    report = ConsoleReporter(len(files), args.quiet)
+    active = []
+
+    def run_one(index, path):
+        name = os.path.basename(path)
+        job = ExportJob(path, settings,
+                        on_progress=lambda d, t, f: report.progress(index, name, d, t, f),
+                        on_log=None if args.quiet else lambda msg: report.line(f"[{index}/{len(files)}] {name}: {msg}"))
+        active.append(job)
+        t = time.perf_counter()
+        completed = job.run()
+        return job, completed, time.perf_counter() - t
+
+    failures = 0
+    pool = ThreadPoolExecutor(max_workers=jobs)
+    futures = {pool.submit(run_one, i, path): path for i, path in enumerate(files, 1)}
+    try:
+        for fut in as_completed(futures):
+            path = futures[fut]
+            try:
+                job, completed, secs = fut.result()
+                if completed:
+                    report.line(f"OK   {path} -> {job.out_path} ({secs:.1f}s)")
+                else:
+                    failures += 1
+                    report.line(f"STOP {path}")
+            except Exception as e:
+                failures += 1
+                report.line(f"FAIL {path}: {e}")
+    except KeyboardInterrupt:
+        report.line("Interrupted, cancelling running jobs...")
+        pool.shutdown(wait=False, cancel_futures=True)
+        for job in active:
+            job.cancel()
+        pool.shutdown(wait=True)
+        return 130
+    pool.shutdown()
+
+    report.line(f"{len(files) - failures}/{len(files)} files done")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+
+# Unchanged-frame detection for the video path. Each frame is reduced to a
+# small grid of cell averages, and a frame counts as unchanged when no cell
+# moved further than the threshold (in 8-bit levels) from the last frame that
+# was actually enhanced. Comparing against that frame rather than the
+# previous one means a slow fade still triggers once it adds up, and a
+# cursor or caption appearing in one corner still changes its cell.
+#
+# A threshold below one level is exact: the grid would average away a
+# change of a few pixels, so whole frames are compared instead and only
+# bit-identical repeats are skipped.
+
+GRID = (64, 36)
+EXACT_BELOW = 1
+
+
+class ChangeDetector:
+    def __init__(self, threshold, grid=GRID):
+        self.threshold = threshold
+        self.grid = grid
+        self.exact = threshold < EXACT_BELOW
+        self.checked = 0
+        self.skipped = 0
+        self._ref = None
+
+    def signature(self, frame):
+        return cv2.resize(frame, self.grid, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def changed(self, frame):
+        self.checked += 1
+        if self.exact:
+            return self._changed_exact(frame)
+        sig = self.signature(frame)
+        if self._ref is not None and np.abs(sig - self._ref).max() <= self.threshold:
+            self.skipped += 1
+            return False
+        self._ref = sig
+        return True
+
+    def _changed_exact(self, frame):
+        # The reference is a copy: decoded frames are handed on to the enhancer
+        if self._ref is not None and np.array_equal(frame, self._ref):
+            self.skipped += 1
+            return False
+        if self._ref is None or self._ref.shape != frame.shape:
+            self._ref = frame.copy()
+        else:
+            np.copyto(self._ref, frame)
+        return True
+
+    def reset(self):
+        self._ref = None
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import deque
+
+# FFmpeg status without scraping the human-readable stderr line:
+# "-progress pipe:1 -nostats" makes FFmpeg write key=value blocks to stdout,
+# each block closed by "progress=continue" (or "progress=end" at the end).
+# A reader thread turns those blocks into an FFmpegProgress snapshot, and a
+# second thread drains stderr into a bounded ring so FFmpeg never stalls on
+# a full pipe while the last lines stay available for error messages.
+
+PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats"]
+STDERR_LINES = 40
+
+
+def _number(value, suffix=""):
+    if value is None:
+        return 0.0
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0  # "N/A" before the first frame
+
+
+class FFmpegProgress:
+    def __init__(self, total_frames=0):
+        self.total_frames = total_frames
+        self.frame = 0
+        self.fps = 0.0
+        self.speed = 0.0      # x realtime
+        self.out_time = 0.0   # seconds of output written
+        self.bitrate = 0.0    # kbit/s
+        self.total_size = 0   # bytes
+        self.finished = False
+        self.updated = 0.0    # perf_counter() of the last block
+
+    @property
+    def percent(self):
+        if not self.total_frames:
+            return 0.0
+        return min(100.0, self.frame * 100.0 / self.total_frames)
+
+    @property
+    def eta(self):
+        # Seconds left, or None while the rate or total is unknown
+        if not self.total_frames or self.fps <= 0:
+            return None
+        return max(0.0, (self.total_frames - self.frame) / self.fps)
+
+    def update(self, fields):
+        self.frame = int(_number(fields.get("frame")))
+        self.fps = _number(fields.get("fps"))
+        self.speed = _number(fields.get("speed"), "x")
+        self.bitrate = _number(fields.get("bitrate"), "kbits/s")
+        self.total_size = int(_number(fields.get("total_size")))
+        out_us = fields.get("out_time_us") or fields.get("out_time_ms")  # both are microseconds
+        self.out_time = _number(out_us) / 1e6
+        self.finished = fields.get("progress") == "end"
+        self.updated = time.perf_counter()
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+class ProgressReader:
+    def __init__(self, stream, total_frames=0, on_update=None):
+        self.progress = FFmpegProgress(total_frames)
+        self.on_update = on_update
+        self._stream = stream
+        self._thread = threading.Thread(target=self._loop, name="ffmpeg-progress", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        fields = {}
+        try:
+            for raw in iter(self._stream.readline, b""):
+                key, sep, value = raw.decode(errors="replace").strip().partition("=")
+                if not sep:
+                    continue
+                fields[key] = value
+                if key == "progress":
+                    self.progress.update(fields)
+                    fields = {}
+                    if self.on_update:
+                        self.on_update(self.progress)
+        except (OSError, ValueError):
+            pass  # pipe closed under us on cancel
+        finally:
+            try:
+                self._stream.close()
+            except OSError:
+                pass
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+
+class StderrRing:
+    def __init__(self, stream, maxlen=STDERR_LINES):
+        self.lines = deque(maxlen=maxlen)
+        self._stream = stream
+        self._thread = threading.Thread(target=self._loop, name="ffmpeg-stderr", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        try:
+            for line in iter(self._stream.readline, b""):
+                self.lines.append(line.decode(errors="replace").rstrip())
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                self._stream.close()
+            except OSError:
+                pass
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def text(self):
+        return "\n".join(self.lines)
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from functools import lru_cache
+
+# FFmpeg helpers, resolved once per process
+
+def _bundle_dir():
+    if getattr(sys, 'frozen', False):
+        return sys._MEIPASS
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def hidden_startupinfo():
+    # Keeps FFmpeg's console window from flashing up on Windows
+    if os.name != 'nt':
+        return None
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    startupinfo.wShowWindow = subprocess.SW_HIDE
+    return startupinfo
+
+@lru_cache(maxsize=None)
+def get_ffmpeg_path():
+    try:
+        subprocess.run(["ffmpeg", "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+                       startupinfo=hidden_startupinfo())
+        print("Using system FFmpeg")
+        return "ffmpeg"
+    except:
+        bundled = os.path.join(_bundle_dir(), "ffmpeg.exe")
+        if os.path.isfile(bundled):
+            print("Using bundled FFmpeg")
+            return bundled
+        raise FileNotFoundError("FFmpeg not found. Install it or place ffmpeg.exe next to script.")
+
+@lru_cache(maxsize=None)
+def get_ffprobe_path():
+    try:
+        subprocess.run(["ffprobe", "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+                       startupinfo=hidden_startupinfo())
+        return "ffprobe"
+    except:
+        probe = os.path.join(_bundle_dir(), "ffprobe.exe")
+        return probe if os.path.isfile(probe) else None
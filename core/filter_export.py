@@ -0,0 +1,68 @@
+import subprocess
+
+from core.ffmpeg_progress import FFmpegProgress, PROGRESS_ARGS, ProgressReader, StderrRing
+from core.ffmpeg_tools import hidden_startupinfo
+
+# FFmpeg-only export: the model's get_ffmpeg_vf graph (hqdn3d, unsharp, cas,
+# eq, lanczos scale) runs inside a single FFmpeg process, sliced across
+# threads with -filter_threads. No frame passes through Python, so this is
+# far faster than the OpenCV stages at some cost in quality; core.parity
+# measures both sides of that trade.
+
+
+def filter_cmd(ffmpeg_path, src, dst, vf, encode_args, threads=0):
+    slicing = ["-filter_threads", str(threads), "-threads", str(threads)] if threads else []
+    return [
+        ffmpeg_path, "-v", "error", "-nostdin", *PROGRESS_ARGS,
+        *slicing, "-i", src,
+        "-map", "0:v:0", "-map", "0:a?",
+        "-vf", vf,
+        *encode_args,
+        "-y", dst
+    ]
+
+
+class FilterGraphExport:
+    def __init__(self, ffmpeg_path, src, dst, vf, encode_args, total_frames=0, threads=0, on_progress=None):
+        self.cmd = filter_cmd(ffmpeg_path, src, dst, vf, encode_args, threads)
+        self.total_frames = total_frames
+        self.on_progress = on_progress
+
+        self.frames_done = 0
+        self.frames_skipped = 0
+        self.fps = 0.0
+        self.cancelled = False
+        self.encoder_progress = FFmpegProgress(total_frames)
+        self._proc = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self._proc and self._proc.poll() is None:
+            try:
+                self._proc.terminate()
+            except OSError:
+                pass
+
+    def _update(self, progress):
+        self.frames_done = progress.frame
+        self.fps = progress.fps
+        if self.on_progress:
+            self.on_progress(self.frames_done, self.total_frames, self.fps)
+
+    def run(self):
+        # True when the output was written, False when cancelled; raises on failure
+        if self.cancelled:
+            return False
+        self._proc = subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                      startupinfo=hidden_startupinfo())
+        reader = ProgressReader(self._proc.stdout, self.total_frames, on_update=self._update)
+        self.encoder_progress = reader.progress
+        stderr = StderrRing(self._proc.stderr)
+        self._proc.wait()
+        reader.join(timeout=1)
+        stderr.join(timeout=1)
+        if self.cancelled:
+            return False
+        if self._proc.returncode != 0:
+            raise RuntimeError(f"FFmpeg filter export failed (code {self._proc.returncode})\n{stderr.text()}")
+        return True
@@ -0,0 +1,142 @@
+import bisect
+import subprocess
+from collections import OrderedDict
+
+import cv2
+
+from core.ffmpeg_tools import hidden_startupinfo
+
+PREVIEW_SIZE = (680, 460)
+# Without a keyframe index, read forward instead of seeking for gaps up to this many frames
+SEQUENTIAL_READ_LIMIT = 48
+
+
+def fit_size(w, h, max_w, max_h):
+    ratio = min(max_w / w, max_h / h)
+    return max(1, int(w * ratio)), max(1, int(h * ratio))
+
+
+class KeyframeIndex:
+    def __init__(self, frames):
+        self.frames = sorted(set(frames)) or [0]
+
+    @classmethod
+    def build(cls, ffprobe_path, path, fps):
+        # One pass over the packet headers; no frames are decoded
+        cmd = [ffprobe_path, "-v", "error", "-select_streams", "v:0",
+               "-show_entries", "packet=pts_time,flags", "-of", "csv=print_section=0", path]
+        out = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                             startupinfo=hidden_startupinfo(), check=True).stdout.decode(errors="replace")
+        times, key_times = [], []
+        for line in out.splitlines():
+            parts = line.strip().split(",")
+            if len(parts) < 2:
+                continue
+            try:
+                t = float(parts[0])
+            except ValueError:
+                continue
+            times.append(t)
+            if "K" in parts[1]:
+                key_times.append(t)
+        if not times:
+            return cls([0])
+        start = min(times)
+        return cls(int(round((t - start) * fps)) for t in key_times)
+
+    def previous(self, frame):
+        i = bisect.bisect_right(self.frames, frame) - 1
+        return self.frames[max(i, 0)]
+
+
+class FrameCache:
+    def __init__(self, max_mb=128):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.bytes = 0
+        self._frames = OrderedDict()
+
+    def get(self, n):
+        frame = self._frames.get(n)
+        if frame is not None:
+            self._frames.move_to_end(n)
+        return frame
+
+    def put(self, n, frame):
+        old = self._frames.pop(n, None)
+        if old is not None:
+            self.bytes -= old.nbytes
+        self._frames[n] = frame
+        self.bytes += frame.nbytes
+        while self.bytes > self.max_bytes and len(self._frames) > 1:
+            _, evicted = self._frames.popitem(last=False)
+            self.bytes -= evicted.nbytes
+
+    def clear(self):
+        self._frames.clear()
+        self.bytes = 0
+
+
+class PreviewFrameSource:
+    # Random access to preview-sized frames for timeline scrubbing
+    def __init__(self, path, preview_size=PREVIEW_SIZE, cache_mb=128, media=None):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if media is not None:
+            self.frame_count, self.fps = media.frame_count, media.fps or 30
+            self.width, self.height = media.width, media.height
+        else:
+            self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+            self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.preview_size = fit_size(self.width, self.height, *preview_size) if self.width and self.height else preview_size
+        self.cache = FrameCache(cache_mb)
+        self.keyframes = None
+        self.pos = 0  # frame number the next cap.read() returns
+        self.seeks = 0
+        self.sequential_reads = 0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def load_keyframes(self, media):
+        self.keyframes = media.keyframes()
+
+    def _read_forward(self, n):
+        # Seeking decodes from the keyframe at or before n; reading on from the
+        # current position is cheaper whenever that keyframe is not past it
+        gap = n - self.pos
+        if gap < 0:
+            return False
+        if self.keyframes is not None:
+            return self.keyframes.previous(n) <= self.pos
+        return gap <= SEQUENTIAL_READ_LIMIT
+
+    def get(self, n):
+        n = max(0, min(int(n), max(self.frame_count - 1, 0)))
+        frame = self.cache.get(n)
+        if frame is not None:
+            return frame
+
+        if self._read_forward(n):
+            self.sequential_reads += 1
+            while self.pos < n:
+                if not self.cap.grab():
+                    return None
+                self.pos += 1
+        else:
+            self.seeks += 1
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, n)
+            self.pos = n
+
+        ret, full = self.cap.read()
+        if not ret:
+            return None
+        self.pos = n + 1
+        frame = cv2.resize(full, self.preview_size, interpolation=cv2.INTER_AREA)
+        self.cache.put(n, frame)
+        return frame
+
+    def release(self):
+        self.cap.release()
+        self.cache.clear()
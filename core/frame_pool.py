@@ -0,0 +1,189 @@
+import multiprocessing as mp
+import os
+import queue
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Process pool for the OpenCV enhancers. Frames never travel through the
+# task queues: each slot owns an input and an output buffer in shared
+# memory, and only slot numbers are exchanged with the workers.
+#
+# With temporal denoising a task also names the slots of the preceding
+# frames; those slots stay allocated until every frame reading them is done.
+
+
+def _attach(name, shape):
+    shm = shared_memory.SharedMemory(name=name)
+    slots = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    return shm, slots
+
+
+def _worker(enhancer, in_name, in_shape, out_name, out_shape, tasks, results):
+    import cv2
+    from models.registry import prewarm
+    cv2.setNumThreads(1)  # parallelism comes from the pool, not from OpenCV
+    prewarm(enhancer)  # OpenCV's first-call setup happens here, not on this worker's first frame
+
+    in_shm, inputs = _attach(in_name, in_shape)
+    out_shm, outputs = _attach(out_name, out_shape)
+    size = (out_shape[2], out_shape[1])
+    history = getattr(enhancer, "temporal", 0)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                timings = getattr(enhancer, "timings", None)
+                if timings is not None:
+                    results.put(("timings", timings.to_dict()))
+                break
+            slot, past = task
+            try:
+                if history:
+                    enhancer.prime_temporal([inputs[p] for p in past], size)
+                enhancer.process(inputs[slot], size, out=outputs[slot])
+                results.put((slot, None))
+            except Exception as e:
+                results.put((slot, f"{type(e).__name__}: {e}"))
+    finally:
+        del inputs, outputs
+        in_shm.close()
+        out_shm.close()
+
+
+def default_workers(cores=None):
+    return max(1, cores or os.cpu_count() or 1)
+
+
+class FramePool:
+    def __init__(self, enhancer, in_shape, out_shape=None, workers=None, slots=None):
+        self.enhancer = enhancer
+        self.workers = default_workers(workers)
+        self.history = getattr(enhancer, "temporal", 0)
+        self.slots = max(int(slots or self.workers * 2), self.workers) + self.history
+        self.in_shape = (self.slots, *in_shape)
+        self.out_shape = (self.slots, *(out_shape or in_shape))
+
+        self._in_shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.in_shape)))
+        self._out_shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.out_shape)))
+        self._inputs = np.ndarray(self.in_shape, dtype=np.uint8, buffer=self._in_shm.buf)
+        self._outputs = np.ndarray(self.out_shape, dtype=np.uint8, buffer=self._out_shm.buf)
+
+        # spawn everywhere: forking a process that owns Tk/ffmpeg threads is unsafe
+        ctx = mp.get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs = [
+            ctx.Process(target=_worker, daemon=True,
+                        args=(enhancer, self._in_shm.name, self.in_shape,
+                              self._out_shm.name, self.out_shape, self._tasks, self._results))
+            for _ in range(self.workers)
+        ]
+        for p in self._procs:
+            p.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _wait_result(self):
+        while True:
+            try:
+                slot, err = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if not all(p.is_alive() for p in self._procs):
+                    raise RuntimeError("Enhancer worker process died")
+                continue
+            if err:
+                raise RuntimeError(f"Enhancer worker failed: {err}")
+            return slot
+
+    def imap(self, frames):
+        # Yields enhanced frames in input order; at most `slots` frames are in flight
+        free = deque(range(self.slots))
+        slot_seq = [0] * self.slots
+        slot_past = [()] * self.slots
+        refs = [0] * self.slots  # frames in flight (or the history window) still reading a slot
+        recent = deque()
+
+        def release(slot):
+            refs[slot] -= 1
+            if not refs[slot]:
+                free.append(slot)
+        finished = {}
+        submitted = 0
+        next_out = 0
+        frames = iter(frames)
+        exhausted = False
+
+        while True:
+            while free and not exhausted:
+                frame = next(frames, None)
+                if frame is None:
+                    exhausted = True
+                    break
+                slot = free.popleft()
+                self._inputs[slot] = frame
+                slot_seq[slot] = submitted
+                slot_past[slot] = past = tuple(recent)
+                for s in past + (slot,):
+                    refs[s] += 1
+                if self.history:
+                    recent.append(slot)
+                    refs[slot] += 1
+                    if len(recent) > self.history:
+                        release(recent.popleft())
+                submitted += 1
+                self._tasks.put((slot, past))
+
+            if next_out == submitted:
+                if exhausted:
+                    return
+                continue
+
+            slot = self._wait_result()
+            finished[slot_seq[slot]] = slot
+            while next_out in finished:
+                slot = finished.pop(next_out)
+                out = self._outputs[slot].copy()
+                for s in slot_past[slot] + (slot,):
+                    release(s)
+                next_out += 1
+                yield out
+
+    def _collect_timings(self):
+        # Workers time their own stages; fold their histograms into the parent's
+        timings = getattr(self.enhancer, "timings", None)
+        if timings is None:
+            return
+        pending = len(self._procs)
+        while pending:
+            try:
+                kind, payload = self._results.get(timeout=2)
+            except queue.Empty:
+                return
+            if kind == "timings":
+                timings.merge(payload)
+                pending -= 1
+
+    def close(self):
+        for _ in self._procs:
+            self._tasks.put(None)
+        self._collect_timings()
+        for p in self._procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self._tasks.close()
+        self._results.close()
+        del self._inputs, self._outputs
+        self._in_shm.close()
+        self._out_shm.close()
+        try:
+            self._in_shm.unlink()
+            self._out_shm.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,264 @@
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+
+from core.processing import ExportJob, ExportSettings, checkpoint_dir
+
+# Persistent export queue. Entries (file + settings + status) are saved to a
+# JSON file on every state change, so pending work survives a restart. A
+# scheduler runs up to max_jobs exports side by side and gives each one a
+# slice of the machine: enhancer worker processes and FFmpeg -threads.
+
+QUEUE_FILE = "queue.json"
+
+OS_RESERVE_GB = 1.5   # left for the OS, the UI and preview
+JOB_RAM_GB = 2.5      # frames in flight + pool slots + encoder for a 4K export
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+def plan_concurrency(ram_gb, cores, max_workers=None, max_jobs=None):
+    # -> (concurrent jobs, cores per job). Unless the job count is fixed, every
+    # job gets at least two cores: one for FFmpeg, the rest for the enhancer.
+    if max_jobs:
+        jobs = max(1, max_jobs)
+    else:
+        by_ram = int((ram_gb - OS_RESERVE_GB) // JOB_RAM_GB)
+        jobs = max(1, min(by_ram, cores // 2))
+    per_job = max(1, cores // jobs)
+    if max_workers:
+        per_job = min(per_job, max_workers)
+    return jobs, per_job
+
+
+class QueueEntry:
+    def __init__(self, path, settings, id=None, status=QUEUED, out_path=None, error=None):
+        self.id = id
+        self.path = path
+        self.settings = settings
+        self.status = status
+        self.out_path = out_path
+        self.error = error
+        self.done = 0
+        self.total = 0
+        self.fps = 0.0
+        self.elapsed = 0.0
+        self.stage_summary = ""
+        self.skipped = 0
+        self.job = None
+        self.thread = None
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def progress(self):
+        if self.status == DONE:
+            return 1.0
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def to_dict(self):
+        return {"id": self.id, "path": self.path, "settings": self.settings.to_dict(),
+                "status": self.status, "out_path": self.out_path, "error": self.error}
+
+    @classmethod
+    def from_dict(cls, d):
+        status = d.get("status", QUEUED)
+        if status == RUNNING:
+            status = QUEUED  # interrupted by the last shutdown, run it again
+        return cls(d["path"], ExportSettings.from_dict(d.get("settings", {})), id=d.get("id"),
+                   status=status, out_path=d.get("out_path"), error=d.get("error"))
+
+
+class JobQueue:
+    def __init__(self, path=QUEUE_FILE, max_jobs=1, cores_per_job=1, on_change=None):
+        self.path = path
+        self.max_jobs = max(1, max_jobs)
+        self.cores_per_job = max(1, cores_per_job)
+        self.on_change = on_change
+        self.entries = []
+        self.paused = False
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._closing = False
+        self.load()
+
+    # ── persistence ──────────────────────────────────────────
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.entries = [QueueEntry.from_dict(d) for d in data.get("jobs", [])]
+        self.paused = bool(data.get("paused")) or any(e.status == QUEUED for e in self.entries)
+        start = max((e.id or 0 for e in self.entries), default=0) + 1
+        self._ids = itertools.count(start)
+        for e in self.entries:
+            if e.id is None:
+                e.id = next(self._ids)
+
+    def save(self):
+        with self._lock:
+            data = {"paused": self.paused, "jobs": [e.to_dict() for e in self.entries]}
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print("Queue save error:", str(e))
+
+    # ── queue editing ────────────────────────────────────────
+    def add(self, path, settings):
+        with self._lock:
+            entry = QueueEntry(path, settings, id=next(self._ids))
+            self.entries.append(entry)
+        self._changed(entry)
+        self._schedule()
+        return entry
+
+    def get(self, entry_id):
+        with self._lock:
+            return next((e for e in self.entries if e.id == entry_id), None)
+
+    def cancel(self, entry_id):
+        with self._lock:
+            entry = self.get(entry_id)
+            if entry is None or entry.finished:
+                return
+            if entry.job:
+                entry.job.cancel()  # status is updated when its thread returns
+                return
+            entry.status = CANCELLED
+        self._changed(entry)
+
+    def remove(self, entry_id):
+        with self._lock:
+            entry = self.get(entry_id)
+            if entry is None or entry.status == RUNNING:
+                return
+            self.entries.remove(entry)
+        self._discard(entry)
+        self._changed(None)
+
+    def clear_finished(self):
+        with self._lock:
+            cleared = [e for e in self.entries if e.finished]
+            self.entries = [e for e in self.entries if not e.finished]
+        for entry in cleared:
+            self._discard(entry)
+        self._changed(None)
+
+    def _discard(self, entry):
+        if entry.status in (CANCELLED, FAILED) and entry.out_path:
+            # Abandoned: drop the segments kept for resuming
+            shutil.rmtree(checkpoint_dir(entry.out_path), ignore_errors=True)
+
+    def set_limits(self, max_jobs, cores_per_job):
+        # Applies to jobs started from now on
+        with self._lock:
+            self.max_jobs = max(1, max_jobs)
+            self.cores_per_job = max(1, cores_per_job)
+        self._schedule()
+
+    def pause(self):
+        self.paused = True
+        self._changed(None)
+
+    def resume(self):
+        self.paused = False
+        self._changed(None)
+        self._schedule()
+
+    def counts(self):
+        with self._lock:
+            statuses = [e.status for e in self.entries]
+        return {s: statuses.count(s) for s in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+
+    def shutdown(self):
+        # Stop running exports; they are saved as queued and resume next launch
+        with self._lock:
+            self._closing = True
+            running = [e for e in self.entries if e.job]
+        for e in running:
+            e.job.cancel()
+        for e in running:
+            if e.thread:
+                e.thread.join(timeout=10)
+        with self._lock:
+            for e in running:
+                e.status = QUEUED
+        self.save()
+
+    # ── scheduler ────────────────────────────────────────────
+    def _changed(self, entry):
+        self.save()
+        if self.on_change:
+            self.on_change(entry)
+
+    def _schedule(self):
+        started = []
+        with self._lock:
+            if self.paused or self._closing:
+                return
+            running = sum(1 for e in self.entries if e.status == RUNNING)
+            for entry in self.entries:
+                if running >= self.max_jobs:
+                    break
+                if entry.status != QUEUED:
+                    continue
+                self._start(entry)
+                started.append(entry)
+                running += 1
+        for entry in started:
+            self._changed(entry)
+
+    def _start(self, entry):
+        s = entry.settings
+        limited = ExportSettings.from_dict(dict(s.to_dict(), workers=min(s.workers or self.cores_per_job, self.cores_per_job),
+                                                threads=self.cores_per_job))
+
+        def progress(done, total, fps):
+            entry.done, entry.total, entry.fps = done, total, fps
+            if self.on_change:
+                self.on_change(entry)
+
+        entry.job = ExportJob(entry.path, limited, on_progress=progress)
+        entry.status = RUNNING
+        entry.error = None
+        entry.done = entry.total = 0
+        entry.out_path = entry.job.out_path
+        entry.thread = threading.Thread(target=self._run, args=(entry,), name=f"export-{entry.id}", daemon=True)
+        entry.thread.start()
+
+    def _run(self, entry):
+        job = entry.job
+        t = time.perf_counter()
+        try:
+            completed = job.run()
+            status = DONE if completed else CANCELLED
+        except Exception as e:
+            status = FAILED
+            entry.error = str(e)
+        with self._lock:
+            entry.job = None
+            entry.fps = job.fps
+            entry.skipped = job.frames_skipped
+            entry.stage_summary = job.timings.short() if job.timings else ""
+            entry.elapsed = time.perf_counter() - t
+            if self._closing:
+                return  # shutdown() records it as queued
+            entry.status = status
+        self._changed(entry)
+        self._schedule()
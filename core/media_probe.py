@@ -0,0 +1,144 @@
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from core.ffmpeg_tools import get_ffprobe_path, hidden_startupinfo
+from core.frame_cache import KeyframeIndex
+
+# One ffprobe run per file (streams + format as JSON), cached by path, mtime
+# and size, so the UI, the size estimate and the export all read the same
+# numbers without reopening the file. Falls back to OpenCV without ffprobe.
+
+CACHE_ENTRIES = 64
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _rate(value):
+    num, _, den = (value or "0/1").partition("/")
+    try:
+        num, den = float(num), float(den or 1)
+    except ValueError:
+        return 0.0
+    return num / den if den else 0.0
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class MediaInfo:
+    def __init__(self, path, width=0, height=0, fps=0.0, frame_count=0, duration=0.0,
+                 video_codec=None, has_audio=False, audio_bitrate=None, source="cv2"):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count = frame_count
+        self.duration = duration
+        self.video_codec = video_codec
+        self.has_audio = has_audio
+        self.audio_bitrate = audio_bitrate  # e.g. "192k", None when unknown
+        self.source = source
+        self._keyframes = None
+        self._keyframes_done = False
+        self._lock = threading.Lock()
+
+    def keyframes(self):
+        # Packet scan on first use only (it reads every packet header); None without ffprobe
+        with self._lock:
+            if not self._keyframes_done:
+                probe = get_ffprobe_path()
+                if probe:
+                    try:
+                        self._keyframes = KeyframeIndex.build(probe, self.path, self.fps or 30)
+                    except (OSError, subprocess.CalledProcessError):
+                        self._keyframes = None
+                self._keyframes_done = True
+            return self._keyframes
+
+
+def _rotation(video):
+    # Display rotation in degrees: the display matrix, else the legacy rotate tag
+    for side in video.get("side_data_list", []):
+        if "rotation" in side:
+            return int(_float(side["rotation"]))
+    return int(_float(video.get("tags", {}).get("rotate")))
+
+
+def _probe_ffprobe(probe, path):
+    cmd = [probe, "-v", "error", "-show_streams", "-show_format", "-of", "json", path]
+    out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, startupinfo=hidden_startupinfo())
+    data = json.loads(out)
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"
+                  and not s.get("disposition", {}).get("attached_pic")), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if video is None:
+        return None
+
+    fps = _rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate"))
+    duration = _float(video.get("duration")) or _float(data.get("format", {}).get("duration"))
+    frames = int(_float(video.get("nb_frames"))) or int(round(duration * fps))
+    abr = audio and audio.get("bit_rate")
+    # FFmpeg's decoder auto-rotates, so every decode (and OpenCV's probe) sees
+    # portrait clips with the coded width and height swapped
+    width, height = int(video.get("width", 0)), int(video.get("height", 0))
+    if _rotation(video) % 180 == 90:
+        width, height = height, width
+    return MediaInfo(
+        path, width=width, height=height,
+        fps=fps, frame_count=frames, duration=duration, video_codec=video.get("codec_name"),
+        has_audio=audio is not None,
+        audio_bitrate=f"{int(abr) // 1000}k" if abr and str(abr).isdigit() else None,
+        source="ffprobe"
+    )
+
+
+def _probe_cv2(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return MediaInfo(
+            path, width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            fps=fps, frame_count=frames, duration=frames / fps if fps else 0.0
+        )
+    finally:
+        cap.release()
+
+
+def probe_media(path):
+    # -> MediaInfo, or None when the file has no readable video stream
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    info = None
+    probe = get_ffprobe_path()
+    if probe:
+        try:
+            info = _probe_ffprobe(probe, path)
+        except (OSError, subprocess.CalledProcessError, ValueError):
+            info = None
+    if info is None:
+        info = _probe_cv2(path)
+
+    with _cache_lock:
+        _cache[key] = info
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return info
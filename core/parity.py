@@ -0,0 +1,119 @@
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+from core.ffmpeg_tools import hidden_startupinfo
+from core.planner import StagePlan
+
+# Parity report between the two export engines. Sampled frames go through
+# the model's OpenCV stages (process) and through its FFmpeg filter graph,
+# and the results are compared with PSNR and SSIM. Throughput is measured
+# for both, so the faster engine can be picked with a known quality cost.
+#
+# hqdn3d (and temporal denoising) look at previous frames, so every sample
+# is decoded together with a few frames before it and both engines see them.
+
+SAMPLES = 8
+PRIME_FRAMES = 4
+SPEED_SECONDS = 3  # of source run through the whole FFmpeg graph for its fps
+
+
+def ssim(a, b):
+    # Mean SSIM of the luma planes, 11x11 Gaussian window (sigma 1.5)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    x = cv2.cvtColor(a, cv2.COLOR_BGR2YCrCb)[..., 0].astype(np.float32)
+    y = cv2.cvtColor(b, cv2.COLOR_BGR2YCrCb)[..., 0].astype(np.float32)
+    blur = lambda img: cv2.GaussianBlur(img, (11, 11), 1.5)
+    mx, my = blur(x), blur(y)
+    vx = blur(x * x) - mx * mx
+    vy = blur(y * y) - my * my
+    cov = blur(x * y) - mx * my
+    num = (2 * mx * my + c1) * (2 * cov + c2)
+    den = (mx * mx + my * my + c1) * (vx + vy + c2)
+    return float((num / den).mean())
+
+
+def sample_positions(total_frames, count=SAMPLES):
+    # Evenly spread, away from the very first and last frames
+    if total_frames <= 0:
+        return [0]
+    count = max(1, min(count, total_frames))
+    return sorted({int((i + 0.5) * total_frames / count) for i in range(count)})
+
+
+def decode_window(ffmpeg_path, src, start, count, fps, size, vf=None):
+    # `count` frames from frame `start` as BGR, optionally through a filter graph.
+    # Seeks like VideoPipeline.decode_cmd, so both engines see the frames an export would.
+    w, h = size
+    cmd = [ffmpeg_path, "-v", "error", "-nostdin"]
+    if start:
+        cmd += ["-ss", f"{(start - 0.5) / fps:.6f}"]
+    cmd += ["-i", src, "-map", "0:v:0", "-fps_mode", "passthrough"]
+    if vf:
+        cmd += ["-vf", vf]
+    cmd += ["-frames:v", str(count), "-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+    raw = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, startupinfo=hidden_startupinfo())
+    frames = np.frombuffer(raw, dtype=np.uint8).reshape(-1, h, w, 3)
+    if len(frames) != count:
+        # A short window would compare the engines on different frames
+        raise RuntimeError(f"Decoded {len(frames)} frames from frame {start}, expected {count}")
+    return frames
+
+
+def ffmpeg_speed(ffmpeg_path, src, vf, threads=0, seconds=SPEED_SECONDS):
+    # Frames per second of decode + filter graph, output discarded
+    cmd = [ffmpeg_path, "-v", "error", "-nostdin", "-progress", "pipe:1", "-nostats"]
+    if threads:
+        cmd += ["-filter_threads", str(threads), "-threads", str(threads)]
+    cmd += ["-t", str(seconds), "-i", src, "-map", "0:v:0", "-vf", vf, "-f", "null", "-"]
+    t = time.perf_counter()
+    out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, startupinfo=hidden_startupinfo())
+    elapsed = time.perf_counter() - t
+    frames = [int(line.split(b"=", 1)[1]) for line in out.splitlines() if line.startswith(b"frame=")]
+    return frames[-1] / elapsed if frames and elapsed > 0 else 0.0
+
+
+def parity_report(ffmpeg_path, src, model, media, out_size, samples=SAMPLES, threads=0):
+    in_size = (media.width, media.height)
+    fps = media.fps or 30
+    vf = StagePlan(model, in_size, out_size).ffmpeg_vf()  # same stage order as process()
+    frames = []
+    python_s = 0.0
+    for n in sample_positions(media.frame_count, samples):
+        start = max(0, n - PRIME_FRAMES)
+        source = decode_window(ffmpeg_path, src, start, n - start + 1, fps, in_size)
+        filtered = decode_window(ffmpeg_path, src, start, n - start + 1, fps, out_size, vf)
+        if model.temporal:
+            model.reset_temporal()
+            for f in source[:-1]:
+                model.process(f, out_size)
+        t = time.perf_counter()
+        enhanced = model.process(source[-1], out_size)
+        python_s += time.perf_counter() - t
+        ff = filtered[-1]
+        frames.append({"frame": n, "psnr": float(cv2.PSNR(enhanced, ff)), "ssim": ssim(enhanced, ff)})
+
+    if not frames:
+        raise RuntimeError("No frames could be sampled")
+    psnr = [f["psnr"] for f in frames]
+    scores = [f["ssim"] for f in frames]
+    return {
+        "vf": vf, "frames": frames,
+        "psnr_mean": float(np.mean(psnr)), "psnr_min": float(np.min(psnr)),
+        "ssim_mean": float(np.mean(scores)), "ssim_min": float(np.min(scores)),
+        "python_fps": len(frames) / python_s if python_s else 0.0,
+        "ffmpeg_fps": ffmpeg_speed(ffmpeg_path, src, vf, threads),
+    }
+
+
+def format_report(report):
+    faster = report["ffmpeg_fps"] / report["python_fps"] if report["python_fps"] else 0.0
+    return [
+        f"FFmpeg graph: {report['vf']}",
+        f"PSNR {report['psnr_mean']:.2f} dB (min {report['psnr_min']:.2f}) • "
+        f"SSIM {report['ssim_mean']:.4f} (min {report['ssim_min']:.4f}) over {len(report['frames'])} frames",
+        f"OpenCV stages {report['python_fps']:.2f} fps (enhancer only) • "
+        f"FFmpeg graph {report['ffmpeg_fps']:.2f} fps (decode + filters) • {faster:.1f}x",
+    ]
@@ -0,0 +1,58 @@
+from models.base_enhancer import DOWNSCALE, NATIVE, UPSCALE, scale_order
+
+# Stage order for one export job. Every stage costs roughly in proportion to
+# the pixels it touches, so the pre-scale stages (the NLM/bilateral
+# denoisers, by far the most expensive) run at whichever of the source and
+# target sizes is smaller:
+#   upscale    pre-scale stages at the source size, Lanczos up, post-scale at the target
+#   downscale  area-downscale first, then every stage at the target size
+#   native     source already at the target size: no resampling step at all
+# BaseEnhancer.process and process_tiled follow the same rule (scale_order);
+# the plan also reorders the FFmpeg graph and describes the job for its log.
+
+
+def _size(size):
+    return f"{size[0]}x{size[1]}"
+
+
+def ffmpeg_graph(vf, order, out_size):
+    # Move the model's scale filter to match the plan: first (area) when
+    # shrinking, where the model put it when enlarging, dropped when native
+    filters = [f for f in vf.split(",") if f]
+    kept = [f for f in filters if not f.startswith("scale=")]
+    if order == UPSCALE:
+        return ",".join(filters)
+    if order == DOWNSCALE:
+        kept.insert(0, f"scale={out_size[0]}:{out_size[1]}:flags=area")
+    return ",".join(kept)
+
+
+class StagePlan:
+    def __init__(self, enhancer, in_size, out_size, engine="python"):
+        self.enhancer = enhancer
+        self.in_size = tuple(in_size)
+        self.out_size = tuple(out_size)
+        self.engine = engine
+        self.order = scale_order(self.in_size, self.out_size)
+
+    @property
+    def pre_size(self):
+        # Resolution the pre-scale stages run at
+        return self.in_size if self.order == UPSCALE else self.out_size
+
+    def ffmpeg_vf(self):
+        return ffmpeg_graph(self.enhancer.get_ffmpeg_vf(*self.out_size), self.order, self.out_size)
+
+    def describe(self):
+        if self.engine == "ffmpeg":
+            return f"Plan ({self.order}): FFmpeg graph {self.ffmpeg_vf()}"
+        pre = " → ".join(name for name, _, _ in self.enhancer.pre_scale_stages())
+        post = " → ".join(name for name, _, _ in self.enhancer.post_scale_stages())
+        if self.order == NATIVE:
+            return f"Plan (native): {pre} → {post} at {_size(self.out_size)}, no resize"
+        if self.order == DOWNSCALE:
+            saved = 1 - (self.out_size[0] * self.out_size[1]) / (self.in_size[0] * self.in_size[1])
+            return (f"Plan (downscale): area resize {_size(self.in_size)} → {_size(self.out_size)} first, "
+                    f"then {pre} → {post} at {_size(self.out_size)} ({saved:.0%} fewer pixels to denoise)")
+        return (f"Plan (upscale): {pre} at {_size(self.in_size)}, Lanczos → {_size(self.out_size)}, "
+                f"{post} at {_size(self.out_size)}")
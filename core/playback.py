@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+
+# Playback engine: a background thread decodes sequentially into a small
+# ring buffer of preview-sized frames while the UI thread polls for the
+# frame that is due by the wall clock, paced to the source frame rate.
+# Late frames are dropped, either before display or, when the decoder
+# itself falls behind, by grabbing without decoding into a preview.
+
+
+class PlaybackEngine:
+    def __init__(self, path, fps, preview_size, start=0, buffer_frames=8):
+        self.path = path
+        self.fps = fps if fps and fps > 0 else 30
+        self.preview_size = preview_size
+        self.start = start
+        self.buffer_frames = max(2, buffer_frames)
+
+        self.shown = 0
+        self.dropped = 0
+        self.eof = False
+
+        self._buf = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._t0 = None
+        self._thread = threading.Thread(target=self._decode_loop, name="playback-decode", daemon=True)
+        self._thread.start()
+
+    def _due(self, now=None):
+        if self._t0 is None:
+            return self.start
+        now = time.perf_counter() if now is None else now
+        return self.start + int((now - self._t0) * self.fps)
+
+    def _decode_loop(self):
+        cap = cv2.VideoCapture(self.path)
+        if self.start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, self.start)
+        n = self.start
+        try:
+            while not self._stopped:
+                # Too far behind the clock: skip the conversion and resize entirely
+                if self._t0 is not None and n < self._due() - 1:
+                    if not cap.grab():
+                        break
+                    with self._cond:
+                        self.dropped += 1
+                    n += 1
+                    continue
+
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                small = cv2.resize(frame, self.preview_size, interpolation=cv2.INTER_AREA)
+                with self._cond:
+                    while len(self._buf) >= self.buffer_frames and not self._stopped:
+                        self._cond.wait(0.05)
+                    self._buf.append((n, small))
+                    self._cond.notify_all()
+                n += 1
+        finally:
+            cap.release()
+            with self._cond:
+                self.eof = True
+                self._cond.notify_all()
+
+    @property
+    def finished(self):
+        with self._cond:
+            return self.eof and not self._buf
+
+    def poll(self):
+        # Newest frame that is due now, or None when the next frame is not due yet
+        now = time.perf_counter()
+        with self._cond:
+            if self._t0 is None:
+                if not self._buf:
+                    return None
+                # The clock starts with the first decoded frame, so seek latency is not counted as lag
+                self._t0 = now
+            due = self._due(now)
+            picked = None
+            while self._buf and self._buf[0][0] <= due:
+                if picked is not None:
+                    self.dropped += 1
+                picked = self._buf.popleft()
+            if picked is not None:
+                self.shown += 1
+                self._cond.notify_all()
+            return picked
+
+    def next_delay_ms(self):
+        if self._t0 is None:
+            return 5
+        next_due = (self._due() + 1 - self.start) / self.fps + self._t0
+        return max(1, int((next_due - time.perf_counter()) * 1000))
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
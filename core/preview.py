@@ -0,0 +1,93 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from core.frame_cache import PREVIEW_SIZE, fit_size
+
+
+def make_proxy(frame, box=PREVIEW_SIZE):
+    # Downscale to the preview box; never upscale
+    h, w = frame.shape[:2]
+    pw, ph = fit_size(w, h, *box)
+    if pw >= w or ph >= h:
+        return frame
+    return cv2.resize(frame, (pw, ph), interpolation=cv2.INTER_AREA)
+
+
+class LetterboxCanvas:
+    # Fixed-size RGB canvas reused for every frame: the image is resized straight
+    # into its centre and the bars are only repainted when the layout changes
+    def __init__(self, width, height, bg_rgb):
+        self.width = width
+        self.height = height
+        self.bg = tuple(reversed(bg_rgb))
+        self.bgr = np.empty((height, width, 3), dtype=np.uint8)
+        self.rgb = np.empty_like(self.bgr)
+        self._rect = None
+
+    def render(self, bgr):
+        h, w = bgr.shape[:2]
+        nw, nh = fit_size(w, h, self.width, self.height)
+        x, y = (self.width - nw) // 2, (self.height - nh) // 2
+        if self._rect != (x, y, nw, nh):
+            self.bgr[:] = self.bg
+            self._rect = (x, y, nw, nh)
+
+        roi = self.bgr[y:y + nh, x:x + nw]
+        interp = cv2.INTER_AREA if nw < w else cv2.INTER_LINEAR
+        out = cv2.resize(bgr, (nw, nh), dst=roi, interpolation=interp)
+        if out is not roi:
+            roi[...] = out
+        cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        return self.rgb
+
+
+class PreviewWorker:
+    # Single background thread with a one-slot mailbox: posting a job replaces
+    # any job that has not started yet, so bursts of slider events collapse
+    # into one render and the most recent request is always the last rendered.
+    def __init__(self, render, deliver):
+        self._render = render
+        self._deliver = deliver
+        self._cond = threading.Condition()
+        self._job = None
+        self._stopped = False
+        self.rendered = 0
+        self.coalesced = 0
+        self.last_ms = 0.0
+        self._thread = threading.Thread(target=self._loop, name="preview-worker", daemon=True)
+        self._thread.start()
+
+    def post(self, job):
+        with self._cond:
+            if self._job is not None:
+                self.coalesced += 1
+            self._job = job
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._job = None
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._job is None and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                job, self._job = self._job, None
+
+            t = time.perf_counter()
+            try:
+                result = self._render(job)
+            except Exception as e:
+                print("Preview worker error:", str(e))
+                continue
+            self.last_ms = (time.perf_counter() - t) * 1000
+            self.rendered += 1
+            self._deliver(job, result)
@@ -0,0 +1,387 @@
+import os
+
+from core.ffmpeg_tools import get_ffmpeg_path, get_ffprobe_path
+
+# Processing core shared by the desktop app and the command line.
+# Nothing in here touches tkinter or widget state.
+#
+# Importing this module must stay cheap: the app needs its constants and
+# settings before the window appears. OpenCV, NumPy and the pipelines are
+# imported inside the functions that run an export, like the model
+# registry in load_model.
+
+VIDEO_MODELS = {
+    "Lite Restore": "lite_restore",
+    "Pro Detail": "pro_detail",
+    "Ultra Native": "ultra_native"
+}
+
+IMAGE_MODEL = {
+    "Image Enhance": "image_enhance"
+}
+
+DEFAULT_VIDEO_MODEL = "Ultra Native"
+TEMPORAL_FRAMES = 1  # previous frames used when temporal denoising is switched on
+DEFAULT_IMAGE_MODEL = "Image Enhance"
+DEFAULT_SHARPEN = 2.0
+SHARPEN_STEP = 0.1  # the app's slider resolution; each step is one cached model instance
+
+VIDEO_EXTS = ('.mp4', '.mkv', '.avi', '.mov')
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+TARGETS = {"Fit 2K": (2560,1440), "Fit 3K": (2880,1620), "Fit 4K": (3840,2160)}
+
+# Video engines: the OpenCV stages in Python, or the model's FFmpeg filter graph
+ENGINES = {"OpenCV filters": "python", "FFmpeg filters": "ffmpeg"}
+
+# Largest change (8-bit levels, per 30x30 px cell at 1080p) for a frame to reuse the previous output;
+# below one level only bit-identical frames are reused (change_detect.EXACT_BELOW)
+SKIP_THRESHOLDS = {"Off": 0, "Exact": 0.5, "Near": 2, "Loose": 4}
+
+FORMAT_CODECS = {
+    "mp4":  {"c_v": "libx264", "c_a": "aac",  "f": None,     "movflags": "+faststart", "audio_b": "192k"},
+    "mov":  {"c_v": "libx264", "c_a": "aac",  "f": "mov",    "movflags": None,         "audio_b": "192k"},
+    "m4v":  {"c_v": "libx264", "c_a": "aac",  "f": "ipod",   "movflags": "+faststart", "audio_b": "192k"},
+    "avi":  {"c_v": "mpeg4",   "c_a": "mp2",  "f": "avi",    "movflags": None,         "audio_b": "192k"},
+    "mxf":  {"c_v": "mpeg2video", "c_a": "pcm_s16le", "f": "mxf", "movflags": None,   "audio_b": None},
+    "3gp":  {"c_v": "mpeg4",   "c_a": "aac",  "f": "3gp",    "movflags": None,         "audio_b": "128k"}
+}
+
+
+def is_video_path(path):
+    return path.lower().endswith(VIDEO_EXTS)
+
+
+def is_media_path(path):
+    return path.lower().endswith(VIDEO_EXTS + IMAGE_EXTS)
+
+
+def calculate_size(w, h, target):
+    tw, th = TARGETS.get(target, (3840,2160))
+    scale = min(tw / w, th / h)
+    return int(w * scale // 2 * 2), int(h * scale // 2 * 2)
+
+
+def get_output_path(input_path, is_video, fmt="mp4", output_folder=None):
+    base, _ = os.path.splitext(os.path.basename(input_path))
+    if is_video:
+        ext = f".{fmt}"
+    else:
+        ext = os.path.splitext(input_path)[1]
+    filename = f"{base}_enhanced{ext}"
+    if output_folder and os.path.isdir(output_folder):
+        return os.path.join(output_folder, filename)
+    return os.path.join(os.path.dirname(input_path), filename)
+
+
+def choose_preset(bitrate_mbps):
+    # Auto preset based on bitrate
+    if bitrate_mbps <= 8:
+        return "veryfast"
+    elif bitrate_mbps <= 15:
+        return "faster"
+    elif bitrate_mbps <= 25:
+        return "fast"
+    elif bitrate_mbps <= 40:
+        return "medium"
+    return "slow"
+
+
+def load_model(model_name, is_video, sharpen=DEFAULT_SHARPEN, temporal=0, shared=False):
+    # Prewarmed enhancer from the registry. shared=True hands out the cached
+    # instance itself (the app's preview); exports get their own copy.
+    from models import registry
+
+    names = VIDEO_MODELS if is_video else IMAGE_MODEL
+    if model_name not in names and model_name not in names.values():
+        model_name = DEFAULT_VIDEO_MODEL if is_video else DEFAULT_IMAGE_MODEL
+    params = {"sharpen": sharpen, "temporal": temporal}
+    if shared:
+        return registry.get(model_name, **params)
+    return registry.create(model_name, **params)
+
+
+def checkpoint_dir(out_path):
+    return os.path.join(os.path.dirname(out_path), f".{os.path.basename(out_path)}.segments")
+
+
+def video_encode_args(settings):
+    bitrate_mbps = settings.bitrate
+    video_bitrate = f"{int(bitrate_mbps * 1000)}k"
+    maxrate      = f"{int(bitrate_mbps * 1.5 * 1000)}k"
+    bufsize      = f"{int(bitrate_mbps * 2 * 1000)}k"
+
+    fc = FORMAT_CODECS.get(settings.fmt, FORMAT_CODECS["mp4"])
+    args = [
+        "-c:v", fc["c_v"],
+        "-preset", choose_preset(bitrate_mbps),
+        "-b:v", video_bitrate,
+        "-maxrate", maxrate,
+        "-bufsize", bufsize,
+        "-pix_fmt", "yuv420p",
+    ]
+    if settings.threads:
+        args += ["-threads", str(settings.threads)]
+    return args
+
+
+def audio_encode_args(settings, audio_bitrate="192k"):
+    fc = FORMAT_CODECS.get(settings.fmt, FORMAT_CODECS["mp4"])
+    args = ["-c:a", fc["c_a"]]
+    audio_b = fc.get("audio_b", audio_bitrate)
+    if audio_b:
+        args += ["-b:a", audio_b]
+    return args
+
+
+def container_args(settings):
+    fc = FORMAT_CODECS.get(settings.fmt, FORMAT_CODECS["mp4"])
+    args = []
+    if fc.get("f"):
+        args += ["-f", fc["f"]]
+    if fc.get("movflags"):
+        args += ["-movflags", fc["movflags"]]
+    return args
+
+
+def build_encode_args(settings, audio_bitrate="192k"):
+    return video_encode_args(settings) + audio_encode_args(settings, audio_bitrate) + container_args(settings)
+
+
+class ExportSettings:
+    def __init__(self, model=None, target="Fit 4K", bitrate=12, fmt="mp4", sharpen=DEFAULT_SHARPEN,
+                 workers=1, memory_budget_mb=None, output_folder=None, threads=0, segments=0,
+                 timing=False, temporal=0, skip_threshold=0, engine="python"):
+        self.model = model
+        self.target = target
+        self.bitrate = bitrate
+        self.fmt = fmt
+        self.sharpen = sharpen
+        self.workers = workers
+        self.memory_budget_mb = memory_budget_mb  # image tile working set, None = tiling's default
+        self.output_folder = output_folder
+        self.threads = threads  # FFmpeg -threads per process, 0 = FFmpeg default
+        self.segments = segments  # 0 = one continuous stream, N = checkpointed segments, N at a time
+        self.timing = timing  # record per-stage wall time and log it when the export ends
+        self.temporal = temporal  # previous frames for temporal denoising (video), 0 = per frame
+        self.skip_threshold = skip_threshold  # unchanged-frame reuse (video), 0 = enhance every frame
+        self.engine = engine  # "python" (OpenCV stages) or "ffmpeg" (filter graph only)
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**{k: v for k, v in d.items() if k in cls().__dict__})
+
+    def output_key(self, is_video=True):
+        # Settings that change the encoded result (not how fast it is produced)
+        key = {"model": self.model_for(is_video), "target": self.target, "bitrate": self.bitrate,
+               "fmt": self.fmt, "sharpen": self.sharpen}
+        if self.temporal and is_video:
+            key["temporal"] = self.temporal
+        if self.skip_threshold and is_video:
+            key["skip_threshold"] = self.skip_threshold
+        if self.engine != "python" and is_video:
+            key["engine"] = self.engine
+        return key
+
+    def model_for(self, is_video):
+        names = VIDEO_MODELS if is_video else IMAGE_MODEL
+        if self.model in names:
+            return self.model
+        for name, key in names.items():
+            if self.model == key:
+                return name
+        return DEFAULT_VIDEO_MODEL if is_video else DEFAULT_IMAGE_MODEL
+
+
+class ExportJob:
+    def __init__(self, path, settings, model=None, on_progress=None, on_log=None):
+        self.path = path
+        self.settings = settings
+        self.is_video = is_video_path(path)
+        self.out_path = get_output_path(path, self.is_video, settings.fmt, settings.output_folder)
+        self.model = model
+        self.on_progress = on_progress
+        self.on_log = on_log
+
+        self.fps = 0.0
+        self.frames_done = 0
+        self.frames_skipped = 0
+        self.cancelled = False
+        self.messages = []
+        self.timings = None
+        self._pipeline = None
+
+    @property
+    def progress(self):
+        # FFmpegProgress of the running video export, None before it starts
+        return self._pipeline.encoder_progress if self._pipeline else None
+
+    def log(self, msg):
+        self.messages.append(msg)
+        if self.on_log:
+            self.on_log(msg)
+
+    def cancel(self):
+        self.cancelled = True
+        if self._pipeline:
+            self._pipeline.cancel()
+
+    def _progress(self, done, total, fps):
+        self.frames_done = done
+        if self.on_progress:
+            self.on_progress(done, total, fps)
+
+    def run(self):
+        # True when the output was written, False when cancelled; raises on failure
+        if self.model is None:
+            self.model = load_model(self.settings.model_for(self.is_video), self.is_video, self.settings.sharpen,
+                                    self.settings.temporal)
+        if self.settings.timing:
+            self.timings = self.model.enable_timing()
+        try:
+            if self.is_video:
+                return self._run_video()
+            return self._run_image()
+        finally:
+            if self.timings:
+                for line in self.timings.summary():
+                    self.log(line)
+
+    def _run_image(self):
+        import cv2
+        from core.planner import StagePlan
+        from core.tiling import DEFAULT_BUDGET_MB, process_tiled
+
+        img = cv2.imread(self.path)
+        if img is None:
+            raise ValueError("Cannot read image")
+        h, w = img.shape[:2]
+        nw, nh = calculate_size(w, h, self.settings.target)
+        self.log(f"{w}x{h} -> {nw}x{nh}")
+        self.log(StagePlan(self.model, (w, h), (nw, nh)).describe())
+        # Stages in the planned order around the resize, in overlapping
+        # tiles so large scans stay inside the memory budget
+        enhanced = process_tiled(self.model, img, (nw, nh), self.settings.memory_budget_mb or DEFAULT_BUDGET_MB)
+        del img
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), 92] if self.out_path.lower().endswith(('.jpg', '.jpeg')) else []
+        if not cv2.imwrite(self.out_path, enhanced, params):
+            raise RuntimeError(f"Cannot write {self.out_path}")
+        self._progress(1, 1, 0.0)
+        return True
+
+    def _run_video(self):
+        from core.media_probe import probe_media
+        from core.planner import StagePlan
+
+        ffmpeg_path = get_ffmpeg_path()
+        media = probe_media(self.path)
+        if media is None or not media.width or not media.height:
+            raise ValueError("Cannot read video")
+        w, h = media.width, media.height
+        total_frames = media.frame_count
+        fps = media.fps or 30
+        audio_bitrate = media.audio_bitrate or "192k"
+
+        nw, nh = calculate_size(w, h, self.settings.target)
+        self.log(f"{w}x{h} -> {nw}x{nh}, {total_frames} frames @ {fps:.3f} fps")
+        plan = StagePlan(self.model, (w, h), (nw, nh), self.settings.engine)
+        self.log(plan.describe())
+
+        if self.settings.engine == "ffmpeg":
+            if self.settings.segments:
+                self.log("FFmpeg filters run as one process; Parallel Segments does not apply")
+            completed = self._run_filtergraph(ffmpeg_path, plan, total_frames, audio_bitrate)
+        elif self.settings.segments >= 1:
+            completed = self._run_segmented(ffmpeg_path, media, (nw, nh), fps, total_frames, audio_bitrate)
+        else:
+            completed = self._run_stream(ffmpeg_path, (w, h), (nw, nh), fps, total_frames, audio_bitrate)
+
+        if not completed:
+            if os.path.exists(self.out_path):
+                try:
+                    os.remove(self.out_path)
+                except:
+                    pass
+            self.log("Cancelled")
+            return False
+        self.log(f"Encoded {self._pipeline.frames_done} frames at {self.fps:.1f} fps")
+        self.frames_skipped = self._pipeline.frames_skipped
+        if self.frames_skipped:
+            done = max(1, self._pipeline.frames_done)
+            self.log(f"Reused the previous output for {self.frames_skipped} unchanged frames "
+                     f"({self.frames_skipped * 100 / done:.0f}%)")
+        return True
+
+    def _run_stream(self, ffmpeg_path, in_size, out_size, fps, total_frames, audio_bitrate):
+        # Frames are decoded to raw BGR, run through the selected model, and re-encoded
+        from core.video_pipeline import VideoPipeline
+
+        self._pipeline = VideoPipeline(
+            ffmpeg_path, self.path, self.out_path, self.model,
+            in_size, out_size, fps, build_encode_args(self.settings, audio_bitrate),
+            total_frames=total_frames, workers=self.settings.workers, threads=self.settings.threads,
+            on_progress=self._progress, skip_threshold=self.settings.skip_threshold
+        )
+        if self.cancelled:
+            self._pipeline.cancel()
+        completed = self._pipeline.run()
+        self.fps = self._pipeline.fps
+        return completed
+
+    def _run_filtergraph(self, ffmpeg_path, plan, total_frames, audio_bitrate):
+        from core.filter_export import FilterGraphExport
+
+        vf = plan.ffmpeg_vf()
+        threads = self.settings.threads or os.cpu_count() or 1
+        self.log(f"FFmpeg filters on {threads} threads")
+        self._pipeline = FilterGraphExport(
+            ffmpeg_path, self.path, self.out_path, vf, build_encode_args(self.settings, audio_bitrate),
+            total_frames=total_frames, threads=threads, on_progress=self._progress
+        )
+        if self.cancelled:
+            self._pipeline.cancel()
+        completed = self._pipeline.run()
+        self.fps = self._pipeline.fps
+        return completed
+
+    def _run_segmented(self, ffmpeg_path, media, out_size, fps, total_frames, audio_bitrate):
+        # Segments are checkpointed in a working directory next to the output;
+        # running the same export again only encodes what is missing
+        from core.segments import SegmentedExport, SegmentManifest, plan_segments, source_fingerprint, verify_output
+
+        probe = get_ffprobe_path()
+        workdir = checkpoint_dir(self.out_path)
+        manifest = SegmentManifest(workdir)
+        key = {"source": source_fingerprint(self.path), "settings": self.settings.output_key(),
+               "out_size": out_size, "fps": fps}
+        if manifest.load() and manifest.matches(key):
+            self.log(f"Resuming: {len(manifest.done)}/{len(manifest.segments)} segments already encoded")
+        else:
+            manifest.reset(key, plan_segments(total_frames, fps, self.settings.segments, media.keyframes()))
+        parallel = max(1, self.settings.segments)
+        self.log(f"{len(manifest.segments)} segments, {parallel} in parallel")
+
+        self._pipeline = SegmentedExport(
+            ffmpeg_path, self.path, self.out_path, self.model, (media.width, media.height), out_size, fps,
+            total_frames, manifest.segments, video_encode_args(self.settings),
+            audio_encode_args(self.settings, audio_bitrate) + container_args(self.settings),
+            workdir, parallel=parallel, workers=self.settings.workers,
+            threads=self.settings.threads, on_progress=self._progress, manifest=manifest,
+            skip_threshold=self.settings.skip_threshold
+        )
+        if self.cancelled:
+            self._pipeline.cancel()
+        completed = self._pipeline.run()
+        self.fps = self._pipeline.fps
+        if not completed:
+            return False  # finished segments stay for the next run
+
+        problems = verify_output(self.path, self.out_path, probe, ffmpeg_path=ffmpeg_path,
+                                 boundaries=self._pipeline.boundaries())
+        self._pipeline.cleanup()
+        if problems:
+            raise RuntimeError("Stitched output does not match the source: " + "; ".join(problems))
+        return True
@@ -0,0 +1,359 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from core.ffmpeg_progress import FFmpegProgress, StderrRing
+from core.ffmpeg_tools import hidden_startupinfo
+from core.video_pipeline import VideoPipeline
+
+# Segmented export: the source is split at keyframes into frame ranges that
+# are enhanced and encoded independently (several at once), then joined
+# with the concat demuxer without re-encoding. Audio is muxed once, from the
+# source, in that final pass.
+#
+# Finished segments are checkpointed in a manifest inside the job's working
+# directory, so a cancelled or crashed export picks up where it stopped.
+
+SEGMENT_SECONDS = 60      # target segment length
+MIN_SEGMENT_SECONDS = 5   # shorter ranges are not worth an extra FFmpeg pair
+SEGMENT_EXT = ".mov"      # holds every codec in FORMAT_CODECS with exact frame timestamps
+MANIFEST_FILE = "manifest.json"
+FINGERPRINT_CHUNK = 1 << 20
+
+
+def plan_segments(total_frames, fps, parallel, keyframes=None):
+    # -> [(start_frame, frame_count)]; the last range runs to the end of the file (count 0)
+    if total_frames <= 0:
+        return [(0, 0)]
+    fps = fps or 30
+    longest = max(1, int(total_frames // max(1, int(MIN_SEGMENT_SECONDS * fps))))
+    count = max(parallel, math.ceil(total_frames / (SEGMENT_SECONDS * fps)))
+    count = max(1, min(count, longest))
+
+    starts = [0]
+    for i in range(1, count):
+        n = i * total_frames // count
+        if keyframes:
+            n = keyframes.previous(n)  # decoding can start right at the seek point
+        if n > starts[-1]:
+            starts.append(n)
+    ranges = [(s, e - s) for s, e in zip(starts, starts[1:])]
+    ranges.append((starts[-1], 0))
+    return ranges
+
+
+def _count_packets(ffmpeg_path, path):
+    # -> (frame count, duration in seconds) from a stream-copy pass: exact, no decoding
+    cmd = [ffmpeg_path, "-v", "error", "-nostdin", "-i", path, "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"]
+    out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, startupinfo=hidden_startupinfo())
+    time_base, first, end, frames = 0.0, None, 0, 0
+    for line in out.splitlines():
+        if line.startswith(b"#tb 0:"):
+            num, _, den = line.split(b":", 1)[1].strip().partition(b"/")
+            time_base = int(num) / int(den)
+        elif line and not line.startswith(b"#"):
+            _, _, pts, duration = (int(v) for v in line.split(b",")[:4])
+            first = pts if first is None else min(first, pts)
+            end = max(end, pts + duration)
+            frames += 1
+    return frames, (end - (first or 0)) * time_base
+
+
+def probe_frames(path, ffprobe_path=None, ffmpeg_path=None):
+    # -> (frame count, duration in seconds) of the first video stream
+    if ffprobe_path:
+        cmd = [ffprobe_path, "-v", "error", "-select_streams", "v:0", "-count_packets",
+               "-show_entries", "stream=nb_read_packets,avg_frame_rate,duration", "-of", "json", path]
+        try:
+            out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, startupinfo=hidden_startupinfo())
+            stream = json.loads(out)["streams"][0]
+            frames = int(stream["nb_read_packets"])
+            if stream.get("duration") not in (None, "N/A"):
+                return frames, float(stream["duration"])
+            num, _, den = stream.get("avg_frame_rate", "0/1").partition("/")
+            rate = float(num) / float(den or 1) if float(den or 1) else 0
+            return frames, frames / rate if rate else 0.0
+        except (OSError, subprocess.CalledProcessError, ValueError, KeyError, IndexError):
+            pass
+    if ffmpeg_path:
+        try:
+            return _count_packets(ffmpeg_path, path)
+        except (OSError, subprocess.CalledProcessError, ValueError):
+            pass
+    cap = cv2.VideoCapture(path)
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return frames, frames / fps if fps else 0.0
+
+
+def verify_output(src, dst, ffprobe_path=None, tolerance_frames=0, ffmpeg_path=None, boundaries=()):
+    # The stitched file must hold every source frame and last as long as the
+    # source, and every segment must start on the frame the previous one was
+    # followed by. `boundaries` is SegmentedExport.boundaries().
+    src_frames, src_dur = probe_frames(src, ffprobe_path, ffmpeg_path)
+    out_frames, out_dur = probe_frames(dst, ffprobe_path, ffmpeg_path)
+    frame_time = src_dur / src_frames if src_frames else 0.04
+    problems = []
+    if abs(out_frames - src_frames) > tolerance_frames:
+        problems.append(f"frame count {out_frames} != source {src_frames}")
+    if abs(out_dur - src_dur) > tolerance_frames * frame_time + 0.05:
+        problems.append(f"duration {out_dur:.3f}s != source {src_dur:.3f}s")
+    for frame, expected, got in boundaries:
+        if got != expected:
+            problems.append(f"segment starting at frame {frame} does not follow on from the one before")
+    return problems
+
+
+def source_fingerprint(path):
+    # Size plus a hash of the head, middle and tail: cheap even for multi-GB sources
+    size = os.path.getsize(path)
+    h = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        for offset in (0, size // 2, max(0, size - FINGERPRINT_CHUNK)):
+            f.seek(offset)
+            h.update(f.read(FINGERPRINT_CHUNK))
+    return h.hexdigest()
+
+
+class SegmentManifest:
+    # manifest.json: what is being exported (source fingerprint + settings),
+    # the segment plan, and which segments are already encoded
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self.path = os.path.join(workdir, MANIFEST_FILE)
+        self.key = None
+        self.segments = []
+        self.done = set()
+        self.checksums = {}  # index -> [first frame, frame after the range]
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.key = data["key"]
+            self.segments = [tuple(s) for s in data["segments"]]
+            self.done = set(data.get("done", []))
+            self.checksums = {int(i): sums for i, sums in data.get("checksums", {}).items()}
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def matches(self, key):
+        # Compare in JSON form so tuples and lists are equal
+        return self.key is not None and self.key == json.loads(json.dumps(key))
+
+    def reset(self, key, segments):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        os.makedirs(self.workdir, exist_ok=True)
+        self.key = json.loads(json.dumps(key))
+        self.segments = list(segments)
+        self.done = set()
+        self.checksums = {}
+        self.save()
+
+    def mark_done(self, index, checksums=None):
+        with self._lock:
+            self.done.add(index)
+            if checksums:
+                self.checksums[index] = list(checksums)
+            self.save()
+
+    def save(self):
+        data = {"key": self.key, "segments": self.segments, "done": sorted(self.done),
+                "checksums": {str(i): sums for i, sums in sorted(self.checksums.items())}}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+def _concat_line(path):
+    return "file '" + os.path.abspath(path).replace("'", "'\\''") + "'\n"
+
+
+class SegmentedExport:
+    def __init__(self, ffmpeg_path, src, dst, enhancer, in_size, out_size, fps, total_frames,
+                 segments, video_args, final_args, workdir, parallel=2, workers=1, threads=0,
+                 on_progress=None, manifest=None, skip_threshold=0):
+        self.ffmpeg_path = ffmpeg_path
+        self.src = src
+        self.dst = dst
+        self.enhancer = enhancer
+        self.in_size = in_size
+        self.out_size = out_size
+        self.fps_in = fps
+        self.total_frames = total_frames
+        self.segments = segments
+        self.video_args = list(video_args)
+        self.final_args = list(final_args)  # audio codec + container options for the stitched file
+        self.workdir = workdir
+        self.parallel = max(1, min(parallel, len(segments)))
+        # Cores are shared between the segments that run at the same time
+        self.workers = max(1, workers // self.parallel)
+        self.threads = max(1, threads // self.parallel) if threads else 0
+        self.on_progress = on_progress
+        self.manifest = manifest
+        self.skip_threshold = skip_threshold
+
+        self.frames_done = 0
+        self.frames_resumed = 0
+        self.frames_skipped = 0  # in the segments encoded by this run
+        self.fps = 0.0
+        self.cancelled = False
+        self.encoder_progress = FFmpegProgress(total_frames)  # summed over all segments
+
+        self._lock = threading.Lock()
+        self._done = {}
+        self._checksums = dict(manifest.checksums) if manifest else {}
+        self._pipelines = {}
+        self._mux = None
+        self._last_report = 0.0
+
+    def segment_path(self, index):
+        return os.path.join(self.workdir, f"seg_{index:04d}{SEGMENT_EXT}")
+
+    def cancel(self):
+        self.cancelled = True
+        with self._lock:
+            pipelines = list(self._pipelines.values())
+        for p in pipelines:
+            p.cancel()
+        if self._mux and self._mux.poll() is None:
+            self._mux.terminate()
+
+    def _progress(self, index, done):
+        with self._lock:
+            self._done[index] = done
+            self.frames_done = sum(self._done.values())
+            elapsed = time.perf_counter() - self._t0
+            self.fps = (self.frames_done - self.frames_resumed) / elapsed if elapsed > 0 else 0.0
+            p = self.encoder_progress
+            p.frame, p.fps = self.frames_done, self.fps
+            p.speed = self.fps / self.fps_in if self.fps_in else 0.0
+            p.out_time = self.frames_done / self.fps_in if self.fps_in else 0.0
+            p.bitrate = sum(pl.encoder_progress.bitrate for pl in self._pipelines.values()) / max(1, len(self._pipelines))
+            p.updated = time.perf_counter()
+            now = time.perf_counter()
+            if now - self._last_report < 0.25:
+                return
+            self._last_report = now
+        if self.on_progress:
+            self.on_progress(self.frames_done, self.total_frames, self.fps)
+
+    def _run_segment(self, index):
+        if self.cancelled:
+            return False
+        start, count = self.segments[index]
+        path = self.segment_path(index)
+        pipeline = VideoPipeline(
+            self.ffmpeg_path, self.src, path, self.enhancer, self.in_size, self.out_size, self.fps_in,
+            self.video_args, total_frames=count, workers=self.workers, threads=self.threads,
+            on_progress=lambda done, total, fps: self._progress(index, done),
+            start_frame=start, frame_count=count, audio=False, skip_threshold=self.skip_threshold,
+            check_next=True
+        )
+        with self._lock:
+            self._pipelines[index] = pipeline
+        if self.cancelled:
+            pipeline.cancel()
+        try:
+            completed = pipeline.run()
+        finally:
+            with self._lock:
+                self._pipelines.pop(index, None)
+                self.frames_skipped += pipeline.frames_skipped
+        self._progress(index, pipeline.frames_done)
+        if completed:
+            checksums = (pipeline.first_checksum, pipeline.next_checksum)
+            with self._lock:
+                self._checksums[index] = checksums
+            if self.manifest:
+                self.manifest.mark_done(index, checksums)
+        return completed
+
+    def boundaries(self):
+        # [(start frame, checksum of the frame decoded straight on from the previous
+        # segment, checksum of the first frame decoded after seeking)] per joint
+        found = []
+        for i in range(1, len(self.segments)):
+            before, after = self._checksums.get(i - 1), self._checksums.get(i)
+            if before and after and before[1]:
+                found.append((self.segments[i][0], before[1], after[0]))
+        return found
+
+    def pending(self):
+        # Segments still to encode; a checkpointed segment whose file is gone is redone
+        if not self.manifest:
+            return list(range(len(self.segments)))
+        return [i for i in range(len(self.segments))
+                if i not in self.manifest.done or not os.path.isfile(self.segment_path(i))]
+
+    def _segment_frames(self, index):
+        start, count = self.segments[index]
+        return count or max(0, self.total_frames - start)
+
+    def _stitch(self):
+        list_path = os.path.join(self.workdir, "segments.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for i in range(len(self.segments)):
+                f.write(_concat_line(self.segment_path(i)))
+        cmd = [
+            self.ffmpeg_path, "-v", "error", "-nostdin",
+            # -r regenerates timestamps at the source rate; copied streams otherwise
+            # inherit the segment container's time base as their frame rate
+            "-r", str(self.fps_in), "-f", "concat", "-safe", "0", "-i", list_path,
+            "-i", self.src,
+            "-map", "0:v:0", "-map", "1:a?",
+            "-c:v", "copy", *self.final_args,
+            "-shortest", "-y", self.dst
+        ]
+        self._mux = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                     startupinfo=hidden_startupinfo())
+        stderr = StderrRing(self._mux.stderr)
+        self._mux.wait()
+        stderr.join(timeout=1)
+        if self.cancelled:
+            return False
+        if self._mux.returncode != 0:
+            raise RuntimeError(f"FFmpeg concat failed (code {self._mux.returncode})\n{stderr.text()}")
+        self.encoder_progress.finished = True
+        return True
+
+    def run(self):
+        # True when the output was written, False when cancelled; raises on failure
+        os.makedirs(self.workdir, exist_ok=True)
+        todo = self.pending()
+        for i in set(range(len(self.segments))) - set(todo):
+            self._done[i] = self._segment_frames(i)
+        self.frames_done = self.frames_resumed = sum(self._done.values())
+
+        self._t0 = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.parallel, len(todo))), thread_name_prefix="segment")
+        futures = [pool.submit(self._run_segment, i) for i in todo]
+        try:
+            for fut in futures:
+                if not fut.result():
+                    self.cancel()
+        except Exception:
+            self.cancel()
+            raise
+        finally:
+            pool.shutdown(wait=True)
+        if self.cancelled:
+            return False
+        if self.on_progress:
+            self.on_progress(self.frames_done, self.total_frames, self.fps)
+        return self._stitch()
+
+    def cleanup(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
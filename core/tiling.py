@@ -0,0 +1,124 @@
+import math
+import time
+
+import cv2
+import numpy as np
+
+from models.base_enhancer import DOWNSCALE, UPSCALE, scale_order
+
+# Tiled execution of enhancer stage chains.
+#
+# A run of tileable stages is applied to overlapping tiles: every tile is
+# grown by the sum of the stages' halos, processed on its own, and only its
+# centre is written into a preallocated output, so the result matches a
+# full-frame pass with no seams. Tile size follows a peak-memory budget.
+
+DEFAULT_BUDGET_MB = 256
+# Rough working set per pixel of a tile: uint8 copies between stages plus
+# OpenCV's internal buffers (NLM integral images, float kernels, ...)
+WORKING_BYTES_PER_PX = 48
+MIN_TILE = 128
+
+
+def chain_halo(stages):
+    total = 0
+    for _, _, halo in stages:
+        if halo is None:
+            return None
+        total += halo
+    return total
+
+
+def tile_side(halo, budget_bytes):
+    side = int(math.sqrt(budget_bytes / WORKING_BYTES_PER_PX)) - 2 * halo
+    return max(side, MIN_TILE)
+
+
+def _split_groups(stages):
+    # Consecutive tileable stages share one tiling pass; global stages run alone
+    groups, run = [], []
+    for stage in stages:
+        if stage[2] is None:
+            if run:
+                groups.append((True, run))
+                run = []
+            groups.append((False, [stage]))
+        else:
+            run.append(stage)
+    if run:
+        groups.append((True, run))
+    return groups
+
+
+def _run(stages, frame, timings=None):
+    # Timed runs record one sample per tile
+    for name, fn, _ in stages:
+        if timings is None:
+            frame = fn(frame)
+        else:
+            t = time.perf_counter()
+            frame = fn(frame)
+            timings.record(name, time.perf_counter() - t)
+    return frame
+
+
+def _tile_pass(stages, frame, budget_bytes, out, timings=None):
+    h, w = frame.shape[:2]
+    if out is None:
+        out = np.empty_like(frame)
+
+    if h * w * WORKING_BYTES_PER_PX <= budget_bytes:
+        out[...] = _run(stages, frame, timings)
+        return out
+
+    halo = chain_halo(stages)
+    side = tile_side(halo, budget_bytes)
+    for y0 in range(0, h, side):
+        y1 = min(y0 + side, h)
+        ya, yb = max(0, y0 - halo), min(h, y1 + halo)
+        for x0 in range(0, w, side):
+            x1 = min(x0 + side, w)
+            xa, xb = max(0, x0 - halo), min(w, x1 + halo)
+            tile = _run(stages, np.ascontiguousarray(frame[ya:yb, xa:xb]), timings)
+            out[y0:y1, x0:x1] = tile[y0 - ya:y1 - ya, x0 - xa:x1 - xa]
+    return out
+
+
+def run_tiled(stages, frame, budget_mb=DEFAULT_BUDGET_MB, out=None, timings=None):
+    budget_bytes = max(1, budget_mb) * 1024 * 1024
+    groups = _split_groups(stages)
+    for i, (tileable, group) in enumerate(groups):
+        dst = out if i == len(groups) - 1 else None
+        if tileable:
+            frame = _tile_pass(group, frame, budget_bytes, dst, timings)
+        else:
+            frame = _run(group, frame, timings)
+            if dst is not None:
+                dst[...] = frame
+                frame = dst
+    return frame
+
+
+def _resize(frame, size, interpolation, timings=None):
+    t = time.perf_counter()
+    scaled = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    cv2.resize(frame, size, dst=scaled, interpolation=interpolation)
+    if timings is not None:
+        timings.record("resize", time.perf_counter() - t)
+    return scaled
+
+
+def process_tiled(enhancer, frame, size, budget_mb=DEFAULT_BUDGET_MB):
+    # Tiled counterpart of BaseEnhancer.process with preallocated buffers
+    if frame is None or frame.size == 0:
+        return frame
+    size = tuple(size)
+    timings = getattr(enhancer, "timings", None)
+    order = scale_order((frame.shape[1], frame.shape[0]), size)
+    if order == DOWNSCALE:
+        frame = _resize(frame, size, cv2.INTER_AREA, timings)
+    scaled = run_tiled(enhancer.pre_scale_stages(), frame, budget_mb, timings=timings)
+    if order == UPSCALE:
+        scaled = _resize(scaled, size, cv2.INTER_LANCZOS4, timings)
+    out = np.empty_like(scaled)
+    return run_tiled(enhancer.post_scale_stages(), scaled, budget_mb, out=out, timings=timings)
@@ -0,0 +1,324 @@
+import hashlib
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from core.change_detect import ChangeDetector
+from core.ffmpeg_progress import FFmpegProgress, PROGRESS_ARGS, ProgressReader, StderrRing
+from core.ffmpeg_tools import hidden_startupinfo
+from core.frame_pool import FramePool
+
+# Streaming video path: ffmpeg (decode) -> enhancer -> ffmpeg (encode)
+# Each stage runs on its own thread and hands frames over bounded queues,
+# so decoding/encoding overlaps with the enhancer instead of blocking it.
+
+_SENTINEL = None
+
+
+def frame_checksum(frame):
+    return hashlib.sha1(np.ascontiguousarray(frame)).hexdigest()
+
+
+class VideoPipeline:
+    def __init__(self, ffmpeg_path, src, dst, enhancer, in_size, out_size, fps, encode_args,
+                 total_frames=0, queue_size=8, workers=1, threads=0, on_progress=None,
+                 start_frame=0, frame_count=0, audio=True, skip_threshold=0, check_next=False):
+        self.ffmpeg_path = ffmpeg_path
+        self.src = src
+        self.dst = dst
+        self.enhancer = enhancer
+        self.in_w, self.in_h = in_size
+        self.out_w, self.out_h = out_size
+        self.fps_in = fps
+        self.encode_args = list(encode_args)
+        self.total_frames = total_frames
+        self.queue_size = max(2, int(queue_size))
+        self.workers = max(1, int(workers))
+        self.threads = int(threads)
+        self.on_progress = on_progress
+        # A segment of the source: frames [start_frame, start_frame + frame_count), video only
+        self.start_frame = start_frame
+        self.frame_count = frame_count
+        self.audio = audio
+        # Checksums of the first decoded frame and, with check_next, of the frame
+        # just past the range (decoded but not enhanced), so neighbouring
+        # segments can be checked to meet on the same frame
+        self.check_next = bool(check_next and frame_count)
+        self.first_checksum = None
+        self.next_checksum = None
+        # Frames within skip_threshold of the last enhanced one reuse its output
+        self.detector = ChangeDetector(skip_threshold) if skip_threshold > 0 else None
+
+        self.frames_done = 0
+        self.frames_skipped = 0
+        self.fps = 0.0
+        self.elapsed = 0.0
+        self.cancelled = False
+        # What the encoder reports about itself: frames written, speed, bitrate, ETA
+        self.encoder_progress = FFmpegProgress(frame_count or total_frames)
+
+        self._cancel = threading.Event()
+        self._error = None
+        self._decoder = None
+        self._encoder = None
+        self._stderr = {}
+
+    # ── control ──────────────────────────────────────────────
+    def cancel(self):
+        self.cancelled = True
+        self._cancel.set()
+        self._terminate()
+
+    def _terminate(self):
+        # The decoder may be blocked writing into a full pipe and would ignore SIGTERM
+        for proc, stop in ((self._decoder, "kill"), (self._encoder, "terminate")):
+            if proc and proc.poll() is None:
+                try:
+                    getattr(proc, stop)()
+                except OSError:
+                    pass
+
+    def _fail(self, msg):
+        if self._error is None:
+            self._error = msg
+        self._cancel.set()
+
+    def _put(self, q, item):
+        while not self._cancel.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._cancel.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _SENTINEL
+
+    # ── ffmpeg processes ─────────────────────────────────────
+    def decode_cmd(self):
+        args = ["-threads", str(self.threads)] if self.threads else []
+        if self.start_frame:
+            # Half a frame early so rounding never drops the first frame of the range
+            args += ["-ss", f"{(self.start_frame - 0.5) / self.fps_in:.6f}"]
+        limit = ["-frames:v", str(self.frame_count + self.check_next)] if self.frame_count else []
+        return [
+            self.ffmpeg_path, "-v", "error", "-nostdin",
+            *args, "-i", self.src,
+            # passthrough: frames leave with their own timestamps, so the CFR muxer
+            # never duplicates the first one after the half-frame-early seek
+            "-map", "0:v:0", "-fps_mode", "passthrough", *limit,
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-"
+        ]
+
+    def encode_cmd(self):
+        if self.audio:
+            inputs = ["-i", self.src, "-map", "0:v:0", "-map", "1:a?"]
+            tail = ["-shortest"]
+        else:
+            inputs = ["-map", "0:v:0"]
+            tail = []
+        return [
+            self.ffmpeg_path, "-v", "error", *PROGRESS_ARGS,
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{self.out_w}x{self.out_h}", "-r", str(self.fps_in),
+            "-i", "-",
+            *inputs,
+            *self.encode_args,
+            *tail, "-y", self.dst
+        ]
+
+    def _spawn(self, cmd, name, **kwargs):
+        proc = subprocess.Popen(cmd, stderr=subprocess.PIPE, startupinfo=hidden_startupinfo(), **kwargs)
+        self._stderr[name] = StderrRing(proc.stderr)
+        return proc
+
+    def _stderr_tail(self, name):
+        ring = self._stderr.get(name)
+        if ring is None:
+            return ""
+        ring.join(timeout=1)  # let the last lines arrive once the process has exited
+        return ring.text()
+
+    # ── stages ───────────────────────────────────────────────
+    def _decode_loop(self, out_q):
+        frame_bytes = self.in_w * self.in_h * 3
+        stdout = self._decoder.stdout
+        index = 0
+        try:
+            while not self._cancel.is_set():
+                frame = np.empty((self.in_h, self.in_w, 3), dtype=np.uint8)
+                view = memoryview(frame).cast("B")
+                got = 0
+                while got < frame_bytes:
+                    n = stdout.readinto(view[got:])
+                    if not n:
+                        break
+                    got += n
+                if got < frame_bytes:
+                    break
+                if self.check_next and index == self.frame_count:
+                    self.next_checksum = frame_checksum(frame)
+                    break
+                if index == 0:
+                    self.first_checksum = frame_checksum(frame)
+                index += 1
+                if not self._put(out_q, frame):
+                    return
+        except Exception as e:
+            self._fail(f"Decoder error: {e}")
+        finally:
+            self._put(out_q, _SENTINEL)
+
+    def _encode_loop(self, in_q):
+        stdin = self._encoder.stdin
+        timings = getattr(self.enhancer, "timings", None)
+        try:
+            while True:
+                frame = self._get(in_q)
+                if frame is _SENTINEL:
+                    break
+                t = time.perf_counter()
+                stdin.write(memoryview(np.ascontiguousarray(frame)).cast("B"))
+                if timings is not None:
+                    # Time blocked on the encoder's pipe: high means encoding is the bottleneck
+                    timings.record("encode", time.perf_counter() - t)
+        except (BrokenPipeError, OSError):
+            if not self._cancel.is_set():
+                self._fail(f"Encoder stopped unexpectedly\n{self._stderr_tail('encode')}")
+        finally:
+            try:
+                stdin.close()
+            except OSError:
+                pass
+
+    def _frames(self, dec_q):
+        timings = getattr(self.enhancer, "timings", None)
+        while True:
+            t = time.perf_counter()
+            frame = self._get(dec_q)
+            if frame is _SENTINEL:
+                return
+            if timings is not None:
+                # Time the enhancer waited for input: high means decoding is the bottleneck
+                timings.record("decode_wait", time.perf_counter() - t)
+            yield frame
+
+    def _enhance(self, frames):
+        # Scaling happens inside the enhancer, between its pre- and post-scale stages
+        out_size = (self.out_w, self.out_h)
+        if self.workers > 1:
+            with FramePool(self.enhancer, (self.in_h, self.in_w, 3), (self.out_h, self.out_w, 3),
+                           workers=self.workers) as pool:
+                yield from pool.imap(frames)
+        else:
+            # Outputs are written into a ring of buffers instead of a new array per
+            # frame. A buffer comes round again only after queue_size + 1 newer
+            # outputs, by which time it has left the encoder queue and the pipe.
+            ring = [np.empty((self.out_h, self.out_w, 3), dtype=np.uint8) for _ in range(self.queue_size + 2)]
+            self.enhancer.reset_temporal()
+            for i, frame in enumerate(frames):
+                yield self.enhancer.process(frame, out_size, out=ring[i % len(ring)])
+
+    def _changed(self, frames, plan):
+        # Only changed frames go on to the enhancer; `plan` records, in order,
+        # whether each decoded frame was sent (True) or is a repeat (False)
+        timings = getattr(self.enhancer, "timings", None)
+        for frame in frames:
+            t = time.perf_counter()
+            changed = self.detector.changed(frame)
+            if timings is not None:
+                timings.record("change_detect", time.perf_counter() - t)
+            plan.append(changed)
+            if changed:
+                yield frame
+            else:
+                self.frames_skipped += 1
+
+    def _enhanced(self, dec_q):
+        frames = self._frames(dec_q)
+        if self.detector is None:
+            yield from self._enhance(frames)
+            return
+        plan = deque()
+        last = None
+        for out in self._enhance(self._changed(frames, plan)):
+            # Repeats read since the previous output belong to it
+            while plan and not plan[0]:
+                plan.popleft()
+                yield last
+            plan.popleft()
+            last = out
+            yield out
+        while plan:
+            plan.popleft()
+            yield last
+
+    def _report(self, force=False):
+        now = time.perf_counter()
+        self.elapsed = now - self._t0
+        if self.elapsed > 0:
+            self.fps = self.frames_done / self.elapsed
+        if self.on_progress and (force or now - self._last_report >= 0.25):
+            self._last_report = now
+            self.on_progress(self.frames_done, self.total_frames, self.fps)
+
+    def run(self):
+        if self.cancelled:
+            return False
+        dec_q = queue.Queue(maxsize=self.queue_size)
+        enc_q = queue.Queue(maxsize=self.queue_size)
+
+        self._decoder = self._spawn(self.decode_cmd(), "decode", stdout=subprocess.PIPE, bufsize=0)
+        self._encoder = self._spawn(self.encode_cmd(), "encode", stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        reader = ProgressReader(self._encoder.stdout, self.encoder_progress.total_frames)
+        self.encoder_progress = reader.progress
+
+        decode_t = threading.Thread(target=self._decode_loop, args=(dec_q,), daemon=True)
+        encode_t = threading.Thread(target=self._encode_loop, args=(enc_q,), daemon=True)
+        decode_t.start()
+        encode_t.start()
+
+        self._t0 = time.perf_counter()
+        self._last_report = 0.0
+        try:
+            for enhanced in self._enhanced(dec_q):
+                if not self._put(enc_q, enhanced):
+                    break
+                self.frames_done += 1
+                self._report()
+        except Exception as e:
+            self._fail(f"Enhancer error: {e}")
+        finally:
+            self._put(enc_q, _SENTINEL)
+
+        encode_t.join()
+        if self._cancel.is_set():
+            self._terminate()
+        decode_t.join(timeout=5)
+        for proc in (self._decoder, self._encoder):
+            try:
+                proc.wait(timeout=3 if self._cancel.is_set() else None)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        self._report(force=True)
+
+        if self.cancelled:
+            return False
+        if self._error:
+            raise RuntimeError(self._error)
+        if self._decoder.returncode != 0:
+            raise RuntimeError(f"FFmpeg decode failed (code {self._decoder.returncode})\n{self._stderr_tail('decode')}")
+        if self._encoder.returncode != 0:
+            raise RuntimeError(f"FFmpeg encode failed (code {self._encoder.returncode})\n{self._stderr_tail('encode')}")
+        return True
@@ -1,72 +1,31 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import cv2
 import os
 import json
 import threading
-import psutil
+import multiprocessing
 import subprocess
-from PIL import Image
-import re
+from PIL import Image, ImageTk
 import time
-import sys
+import warnings
 import shutil
-import numpy as np
+
+# OpenCV, NumPy, psutil and the preview/export modules are imported where they
+# are first used, so the window comes up before any of them has loaded
+from core.processing import (ENGINES, ExportSettings, FORMAT_CODECS, IMAGE_MODEL, VIDEO_MODELS, DEFAULT_IMAGE_MODEL,
+                             DEFAULT_VIDEO_MODEL, DEFAULT_SHARPEN, SHARPEN_STEP, SKIP_THRESHOLDS, TEMPORAL_FRAMES, calculate_size, is_media_path, is_video_path,
+                             load_model)
+from core.ffmpeg_progress import format_eta
+from core.job_queue import JobQueue, plan_concurrency, QUEUED, RUNNING, DONE, FAILED
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
-
-# FFmpeg helpers
-def get_ffmpeg_path():
-    try:
-        subprocess.run(["ffmpeg", "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        print("Using system FFmpeg")
-        return "ffmpeg"
-    except:
-        if getattr(sys, 'frozen', False):
-            base = sys._MEIPASS
-        else:
-            base = os.path.dirname(os.path.abspath(__file__))
-        bundled = os.path.join(base, "ffmpeg.exe")
-        if os.path.isfile(bundled):
-            print("Using bundled FFmpeg")
-            return bundled
-        raise FileNotFoundError("FFmpeg not found. Install it or place ffmpeg.exe next to script.")
-
-def get_ffprobe_path():
-    try:
-        subprocess.run(["ffprobe", "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        return "ffprobe"
-    except:
-        if getattr(sys, 'frozen', False):
-            base = sys._MEIPASS
-        else:
-            base = os.path.dirname(os.path.abspath(__file__))
-        probe = os.path.join(base, "ffprobe.exe")
-        return probe if os.path.isfile(probe) else None
-
-VIDEO_MODELS = {
-    "Lite Restore": "lite_restore",
-    "Pro Detail": "pro_detail",
-    "Ultra Native": "ultra_native"
-}
-
-IMAGE_MODEL = {
-    "Image Enhance": "image_enhance"
-}
+# Preview panels reuse one PhotoImage each instead of building a CTkImage per frame
+warnings.filterwarnings("ignore", message=".*is not CTkImage.*")
 
 CONFIG_FILE = "config.json"
 
-FORMAT_CODECS = {
-    "mp4":  {"c_v": "libx264", "c_a": "aac",  "f": None,     "movflags": "+faststart", "audio_b": "192k"},
-    "mov":  {"c_v": "libx264", "c_a": "aac",  "f": "mov",    "movflags": None,         "audio_b": "192k"},
-    "m4v":  {"c_v": "libx264", "c_a": "aac",  "f": "ipod",   "movflags": "+faststart", "audio_b": "192k"},
-    "avi":  {"c_v": "mpeg4",   "c_a": "mp2",  "f": "avi",    "movflags": None,         "audio_b": "192k"},
-    "mxf":  {"c_v": "mpeg2video", "c_a": "pcm_s16le", "f": "mxf", "movflags": None,   "audio_b": None},
-    "3gp":  {"c_v": "mpeg4",   "c_a": "aac",  "f": "3gp",    "movflags": None,         "audio_b": "128k"}
-}
-
 class NotYUpscalerZAI(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -92,27 +51,38 @@ class NotYUpscalerZAI(ctk.CTk):
         self.is_video = False
         self.cap = None
         self.playing = False
+        self.playback = None
         self.current_frame_bgr = None
         self.output_folder = None
         self.video_duration_sec = 0
 
-        self.current_orig_preview = None
-        self.current_enh_preview  = None
-        self.current_enh_image    = None
+        self.preview_canvases = {}
+        self.preview_photos = {}
+        self.render_ms = 0.0
+        self.last_render_report = 0.0
 
         self.current_model_dict = VIDEO_MODELS
         self.current_model = None
+        self.model_request = 0  # only the newest fetch_model result is applied
+        self.video_request = 0  # likewise for load_video
+
+        self.queue_rows = {}
+        self.queue_refresh_pending = False
 
-        self.export_running = False
-        self.export_cancel_requested = False
-        self.export_process = None
+        # Placeholders until detect_specs has run in the background
+        self.ram_gb = None
+        self.cores = os.cpu_count() or 2
+        self.has_cuda = False
+        self.preview_worker = None
 
         self.load_config()
-        self.detect_specs()
+        self.job_queue = JobQueue(on_change=self.on_queue_change)
 
         self.create_ui()
+        self.refresh_queue()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
-        self.last_preview_time = 0
+        self.after(100, lambda: threading.Thread(target=self.detect_specs, name="specs", daemon=True).start())
 
     def load_config(self):
         if os.path.exists(CONFIG_FILE):
@@ -129,12 +99,32 @@ class NotYUpscalerZAI(ctk.CTk):
             json.dump(self.config, f)
 
     def detect_specs(self):
-        self.ram_gb = psutil.virtual_memory().total / (1024**3)
-        self.cores = psutil.cpu_count(logical=False) or 2
+        # Background thread; importing cv2 here also warms it up for the first file
+        import cv2
+        import psutil
+
+        ram_gb = psutil.virtual_memory().total / (1024**3)
+        cores = psutil.cpu_count(logical=False) or 2
         try:
-            self.has_cuda = cv2.cuda.getCudaEnabledDeviceCount() > 0
+            has_cuda = cv2.cuda.getCudaEnabledDeviceCount() > 0
         except:
-            self.has_cuda = False
+            has_cuda = False
+        self.after(0, lambda: self._specs_ready(ram_gb, cores, has_cuda))
+
+        # Warm the instances the app asks for first: every model at the default
+        # sharpen with the current temporal setting
+        for name in VIDEO_MODELS:
+            load_model(name, True, DEFAULT_SHARPEN, self.temporal_frames(), shared=True)
+        for name in IMAGE_MODEL:
+            load_model(name, False, shared=True)
+
+    def _specs_ready(self, ram_gb, cores, has_cuda):
+        self.ram_gb, self.cores, self.has_cuda = ram_gb, cores, has_cuda
+        self.specs_label.configure(text=f"RAM: {ram_gb:.1f} GB • Cores: {cores} • {'CUDA' if has_cuda else 'CPU'}")
+        if "workers" not in self.config:
+            # The menu was filled in before detection, from the logical CPU count
+            self.workers_var.set(str(max(1, min(cores, self.max_workers))))
+        self.apply_queue_limits()
 
     def create_ui(self):
         top = ctk.CTkFrame(self, height=64, fg_color="#161b22", corner_radius=0)
@@ -144,7 +134,7 @@ class NotYUpscalerZAI(ctk.CTk):
         ctk.CTkLabel(top, text="NotY Upscaler ZAI", font=ctk.CTkFont(family="Segoe UI", size=22, weight="bold"),
                      text_color=self.accent).pack(side="left", padx=24, pady=12)
 
-        self.specs_label = ctk.CTkLabel(top, text=f"RAM: {self.ram_gb:.1f} GB • Cores: {self.cores} • {'CUDA' if self.has_cuda else 'CPU'}",
+        self.specs_label = ctk.CTkLabel(top, text="Detecting hardware…",
                                         font=ctk.CTkFont(family="Segoe UI", size=13), text_color="#a0a0a0")
         self.specs_label.pack(side="right", padx=24, pady=12)
 
@@ -187,13 +177,19 @@ class NotYUpscalerZAI(ctk.CTk):
 
         ctk.CTkButton(ctrl, text="Open in Player", width=140, height=40, command=self.open_in_system_player).pack(side="right", padx=8)
 
+        self.render_label = ctk.CTkLabel(ctrl, text="", font=ctk.CTkFont(size=12), text_color="gray")
+        self.render_label.pack(side="right", padx=8)
+
+        self.playback_label = ctk.CTkLabel(ctrl, text="", font=ctk.CTkFont(size=12), text_color="gray")
+        self.playback_label.pack(side="right", padx=8)
+
         self.info_label = ctk.CTkLabel(left, text="No file loaded", font=ctk.CTkFont(size=13), text_color="gray")
         self.info_label.grid(row=2, column=0, columnspan=2, pady=8)
 
         bottom_left = ctk.CTkFrame(left, fg_color="#161b22")
         bottom_left.grid(row=3, column=0, columnspan=2, sticky="ew", pady=12, padx=12)
 
-        self.export_btn = ctk.CTkButton(bottom_left, text="Export", height=48, fg_color="#1e88e5", hover_color="#1565c0",
+        self.export_btn = ctk.CTkButton(bottom_left, text="Add to Export Queue", height=48, fg_color="#1e88e5", hover_color="#1565c0",
                                         font=ctk.CTkFont(size=15, weight="bold"), command=self.start_export)
         self.export_btn.pack(side="left", padx=8, fill="x", expand=True)
 
@@ -220,22 +216,23 @@ class NotYUpscalerZAI(ctk.CTk):
         self.output_status = ctk.CTkLabel(right, text="Output: same as input", text_color="gray")
         self.output_status.pack(pady=4)
 
-        ctk.CTkLabel(right, text="EXPORT PROGRESS", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=24, pady=(24,8))
+        ctk.CTkLabel(right, text="EXPORT QUEUE", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=24, pady=(24,8))
 
-        self.progress_bar = ctk.CTkProgressBar(right, width=320, height=18, mode="determinate",
-                                               fg_color="#2a2f38", progress_color=self.success)
-        self.progress_bar.pack(pady=8, padx=24)
-        self.progress_bar.set(0)
-        self.progress_bar.pack_forget()
+        self.queue_summary = ctk.CTkLabel(right, text="", font=ctk.CTkFont(size=13), text_color="gray")
+        self.queue_summary.pack(anchor="w", padx=24)
 
-        self.progress_label = ctk.CTkLabel(right, text="0%", font=ctk.CTkFont(size=16, weight="bold"), text_color=self.success)
-        self.progress_label.pack(pady=4)
-        self.progress_label.pack_forget()
+        self.queue_frame = ctk.CTkFrame(right, fg_color="transparent")
+        self.queue_frame.pack(fill="x", padx=20, pady=4)
 
-        self.cancel_btn = ctk.CTkButton(right, text="Cancel Export", height=44,
-                                        fg_color=self.danger, hover_color="#c62828", command=self.cancel_export)
-        self.cancel_btn.pack(pady=8, padx=24, fill="x")
-        self.cancel_btn.pack_forget()
+        queue_btns = ctk.CTkFrame(right, fg_color="transparent")
+        queue_btns.pack(fill="x", padx=24, pady=4)
+        ctk.CTkButton(queue_btns, text="Add Files...", width=100, height=32, fg_color="#2a2f38", hover_color="#3a3f48",
+                      command=self.add_files_to_queue).pack(side="left", padx=(0,4))
+        self.pause_btn = ctk.CTkButton(queue_btns, text="Pause", width=80, height=32, fg_color="#2a2f38", hover_color="#3a3f48",
+                                       command=self.toggle_queue_pause)
+        self.pause_btn.pack(side="left", padx=4)
+        ctk.CTkButton(queue_btns, text="Clear Done", width=90, height=32, fg_color="#2a2f38", hover_color="#3a3f48",
+                      command=self.job_queue.clear_finished).pack(side="left", padx=4)
 
         ctk.CTkLabel(right, text="SETTINGS", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=24, pady=(24,8))
 
@@ -246,6 +243,8 @@ class NotYUpscalerZAI(ctk.CTk):
                                             command=self.on_model_change,
                                             fg_color="#2a2f38", button_color="#3a3f48")
         self.model_menu.pack(padx=24, pady=4, fill="x")
+        self.model_info = ctk.CTkLabel(right, text="", font=ctk.CTkFont(size=12), text_color="gray")
+        self.model_info.pack(anchor="w", padx=24)
 
         ctk.CTkLabel(right, text="Target Resolution", font=ctk.CTkFont(size=14)).pack(anchor="w", padx=24, pady=(12,2))
         self.target_var = ctk.StringVar(value="Fit 4K")
@@ -253,13 +252,62 @@ class NotYUpscalerZAI(ctk.CTk):
                                              variable=self.target_var, fg_color="#2a2f38", button_color="#3a3f48")
         self.target_menu.pack(padx=24, pady=4, fill="x")
 
+        ctk.CTkLabel(right, text="Worker Processes", font=ctk.CTkFont(size=14)).pack(anchor="w", padx=24, pady=(12,2))
+        self.max_workers = max_workers = max(os.cpu_count() or 1, self.cores)
+        self.workers_var = ctk.StringVar(value=str(min(self.config.get("workers", self.cores), max_workers)))
+        self.workers_menu = ctk.CTkOptionMenu(right, values=[str(n) for n in range(1, max_workers + 1)],
+                                              variable=self.workers_var, command=self.on_workers_change,
+                                              fg_color="#2a2f38", button_color="#3a3f48")
+        self.workers_menu.pack(padx=24, pady=4, fill="x")
+
+        ctk.CTkLabel(right, text="Concurrent Exports", font=ctk.CTkFont(size=14)).pack(anchor="w", padx=24, pady=(12,2))
+        self.jobs_var = ctk.StringVar(value=str(self.config.get("max_jobs") or "Auto"))
+        self.jobs_menu = ctk.CTkOptionMenu(right, values=["Auto"] + [str(n) for n in range(1, max_workers + 1)],
+                                           variable=self.jobs_var, command=self.on_jobs_change,
+                                           fg_color="#2a2f38", button_color="#3a3f48")
+        self.jobs_menu.pack(padx=24, pady=4, fill="x")
+
+        self.timing_switch = ctk.CTkSwitch(right, text="Stage Timing", command=self.on_timing_change,
+                                           progress_color=self.accent)
+        if self.config.get("stage_timing"):
+            self.timing_switch.select()
+        self.timing_switch.pack(anchor="w", padx=24, pady=(12,2))
+
         self.format_frame = ctk.CTkFrame(right, fg_color="transparent")
+        ctk.CTkLabel(self.format_frame, text="Parallel Segments", font=ctk.CTkFont(size=14)).pack(anchor="w", padx=24, pady=(12,2))
+        self.segments_var = ctk.StringVar(value=str(self.config.get("segments") or "Off"))
+        self.segments_menu = ctk.CTkOptionMenu(self.format_frame, values=["Off", "1", "2", "3", "4", "6", "8"],
+                                               variable=self.segments_var, command=self.on_segments_change,
+                                               fg_color="#2a2f38", button_color="#3a3f48")
+        self.segments_menu.pack(padx=24, pady=4, fill="x")
+
         ctk.CTkLabel(self.format_frame, text="Output Format", font=ctk.CTkFont(size=14)).pack(anchor="w", padx=24, pady=(12,2))
         self.format_var = ctk.StringVar(value="mp4")
         self.format_menu = ctk.CTkOptionMenu(self.format_frame, values=list(FORMAT_CODECS.keys()),
                                              variable=self.format_var, fg_color="#2a2f38", button_color="#3a3f48")
         self.format_menu.pack(padx=24, pady=4, fill="x")
 
+        self.temporal_switch = ctk.CTkSwitch(self.format_frame, text="Temporal Denoise", command=self.on_temporal_change,
+                                             progress_color=self.accent)
+        if self.config.get("temporal_denoise"):
+            self.temporal_switch.select()
+        self.temporal_switch.pack(anchor="w", padx=24, pady=(12,2))
+
+        ctk.CTkLabel(self.format_frame, text="Reuse Unchanged Frames", font=ctk.CTkFont(size=14)).pack(anchor="w", padx=24, pady=(12,2))
+        self.skip_var = ctk.StringVar(value=self.config.get("skip_unchanged", "Off"))
+        self.skip_menu = ctk.CTkOptionMenu(self.format_frame, values=list(SKIP_THRESHOLDS), variable=self.skip_var,
+                                           command=self.on_skip_change, fg_color="#2a2f38", button_color="#3a3f48")
+        self.skip_menu.pack(padx=24, pady=4, fill="x")
+
+        ctk.CTkLabel(self.format_frame, text="Engine", font=ctk.CTkFont(size=14)).pack(anchor="w", padx=24, pady=(12,2))
+        self.engine_var = ctk.StringVar(value=self.config.get("engine", "OpenCV filters"))
+        self.engine_menu = ctk.CTkOptionMenu(self.format_frame, values=list(ENGINES), variable=self.engine_var,
+                                             command=self.on_engine_change, fg_color="#2a2f38", button_color="#3a3f48")
+        self.engine_menu.pack(padx=24, pady=4, fill="x")
+        self.parity_btn = ctk.CTkButton(self.format_frame, text="Compare Engines", height=28, fg_color="#2a2f38",
+                                        hover_color="#3a3f48", command=self.compare_engines)
+        self.parity_btn.pack(padx=24, pady=4, fill="x")
+
         adj = ctk.CTkFrame(right, fg_color="#1e1e2e", corner_radius=8)
         adj.pack(pady=16, padx=20, fill="x")
 
@@ -267,8 +315,9 @@ class NotYUpscalerZAI(ctk.CTk):
         self.sharpen_frame = ctk.CTkFrame(adj, fg_color="transparent")
         ctk.CTkLabel(self.sharpen_frame, text="Sharpen Strength", font=ctk.CTkFont(size=14, weight="bold")).pack(pady=(12,4))
         self.sharpen_s = ctk.CTkSlider(self.sharpen_frame, from_=0.5, to=4.0, command=self.on_sharpen_change,
+                                       number_of_steps=round((4.0 - 0.5) / SHARPEN_STEP),
                                        fg_color="#2a2f38", progress_color=self.accent)
-        self.sharpen_s.set(2.0)
+        self.sharpen_s.set(DEFAULT_SHARPEN)
         self.sharpen_s.pack(padx=20, pady=(0,12), fill="x")
 
         bitrate_frame = ctk.CTkFrame(adj, fg_color="transparent")
@@ -310,38 +359,109 @@ class NotYUpscalerZAI(ctk.CTk):
 
         self.size_estimate_label.configure(text=f"Estimated size: {text}")
 
-    def on_sharpen_change(self, value):
+    def on_workers_change(self, value):
+        self.config["workers"] = int(value)
+        self.save_config()
+        self.apply_queue_limits()
+
+    def on_timing_change(self):
+        enabled = bool(self.timing_switch.get())
+        self.config["stage_timing"] = enabled
+        self.save_config()
         if self.current_model:
-            self.current_model.sharpen = value
-        if self.live_enabled:
+            if enabled:
+                self.current_model.enable_timing()
+            else:
+                self.current_model.disable_timing()
+
+    def on_temporal_change(self):
+        enabled = bool(self.temporal_switch.get())
+        self.config["temporal_denoise"] = enabled
+        self.save_config()
+        if self.current_model and self.is_video:
+            self.fetch_model()
+        elif self.live_enabled:
             self.live_update()
 
+    def temporal_frames(self):
+        return TEMPORAL_FRAMES if self.config.get("temporal_denoise") else 0
+
+    def sharpen_value(self):
+        # The slider moves in SHARPEN_STEP steps; rounding drops its float noise so equal steps share a cache key
+        return round(self.sharpen_s.get(), 1)
+
+    def on_engine_change(self, value):
+        self.config["engine"] = value
+        self.save_config()
+
+    def compare_engines(self):
+        # PSNR/SSIM and speed of the FFmpeg graph against the OpenCV stages, off the UI thread
+        if not self.is_video or not self.cap or not self.current_model:
+            return
+        # Tk variables are read here; probing and building the model happen in the thread
+        path, model_name, target = self.current_path, self.model_var.get(), self.target_var.get()
+        sharpen, temporal, threads = self.sharpen_value(), self.temporal_frames(), int(self.workers_var.get())
+        self.parity_btn.configure(state="disabled", text="Comparing...")
+
+        def run():
+            from core.ffmpeg_tools import get_ffmpeg_path
+            from core.media_probe import probe_media
+            from core.parity import format_report, parity_report
+
+            text = error = None
+            try:
+                media = probe_media(path)
+                if media is not None:
+                    model = load_model(model_name, True, sharpen, temporal)
+                    out_size = calculate_size(media.width, media.height, target)
+                    report = parity_report(get_ffmpeg_path(), path, model, media, out_size, threads=threads)
+                    text = "\n\n".join(format_report(report))
+            except Exception as e:
+                error = str(e)
+            self.after(0, lambda: self._show_parity(path, text, error))
+
+        threading.Thread(target=run, name="parity", daemon=True).start()
+
+    def _show_parity(self, path, text, error):
+        self.parity_btn.configure(state="normal", text="Compare Engines")
+        if text is None and error is None:  # the file could not be probed
+            self.status.configure(text=f"Cannot read {os.path.basename(path)}", text_color=self.danger)
+        elif error:
+            messagebox.showerror("Compare Engines", error)
+        else:
+            messagebox.showinfo("Compare Engines", text)
+
+    def on_skip_change(self, value):
+        self.config["skip_unchanged"] = value
+        self.save_config()
+
+    def on_segments_change(self, value):
+        self.config["segments"] = 0 if value == "Off" else int(value)
+        self.save_config()
+
+    def on_jobs_change(self, value):
+        self.config["max_jobs"] = 0 if value == "Auto" else int(value)
+        self.save_config()
+        self.apply_queue_limits()
+
+    def apply_queue_limits(self):
+        # Concurrent exports from RAM/cores (or the user's choice); each one gets an
+        # equal share of cores for its worker processes and FFmpeg threads
+        if self.ram_gb is None:
+            return  # applied once detect_specs is done
+        jobs, per_job = plan_concurrency(self.ram_gb, self.cores, int(self.workers_var.get()),
+                                         self.config.get("max_jobs") or None)
+        self.job_queue.set_limits(jobs, per_job)
+
+    def on_sharpen_change(self, value):
+        self.fetch_model()
+
     def on_model_change(self, selected):
         self.model_var.set(selected)
         self.update_model()
-        if self.live_enabled and self.current_frame_bgr is not None:
-            self.live_update()
 
     def update_model(self):
-        model_name = self.model_var.get()
-        sharpen = self.sharpen_s.get() if self.is_video else 0  # no sharpen for images
-        try:
-            if self.is_video:
-                if model_name == "Lite Restore":
-                    from models.lite_restore import LiteRestoreEnhancer
-                    self.current_model = LiteRestoreEnhancer(sharpen=sharpen)
-                elif model_name == "Pro Detail":
-                    from models.pro_detail import ProDetailEnhancer
-                    self.current_model = ProDetailEnhancer(sharpen=sharpen)
-                else:
-                    from models.ultra_native import UltraNativeEnhancer
-                    self.current_model = UltraNativeEnhancer(sharpen=sharpen)
-            else:
-                from models.image_enhance import ImageEnhanceModel
-                self.current_model = ImageEnhanceModel()  # no sharpen param
-        except Exception as e:
-            messagebox.showerror("Model Error", f"Failed to load model:\n{str(e)}")
-            self.current_model = None
+        self.fetch_model()
 
         # Show/hide sharpen slider based on mode
         if self.is_video:
@@ -349,13 +469,46 @@ class NotYUpscalerZAI(ctk.CTk):
         else:
             self.sharpen_frame.pack_forget()
 
+    def fetch_model(self):
+        # The registry's shared instance for the current settings. A cache miss
+        # builds and prewarms it, so the lookup runs off the Tk thread and the
+        # live preview is refreshed once the model is in place.
+        model_name, is_video = self.model_var.get(), self.is_video
+        sharpen = self.sharpen_value() if is_video else 0  # no sharpen for images
+        temporal = self.temporal_frames()
+        self.model_request += 1
+        request = self.model_request
+
+        def run():
+            from models import registry
+            try:
+                model = load_model(model_name, is_video, sharpen, temporal, shared=True)
+                result = (model, registry.find(model_name).describe(), None)
+            except Exception as e:
+                result = (None, "", str(e))
+            self.after(0, lambda: self._model_ready(request, *result))
+
+        threading.Thread(target=run, name="model", daemon=True).start()
+
+    def _model_ready(self, request, model, info, error):
+        if request != self.model_request:
+            return  # settings changed again while this one was loading
+        if error:
+            messagebox.showerror("Model Error", f"Failed to load model:\n{error}")
+        elif self.config.get("stage_timing"):
+            model.enable_timing()
+        self.current_model = model
+        self.model_info.configure(text=info)
+        if self.live_enabled and self.current_frame_bgr is not None:
+            self.live_update()
+
     def select_file(self):
         path = filedialog.askopenfilename(filetypes=[("Media","*.jpg *.jpeg *.png *.webp *.mp4 *.mkv *.avi *.mov")])
         if not path:
             return
 
         self.current_path = path
-        self.is_video = path.lower().endswith(('.mp4','.mkv','.avi','.mov'))
+        self.is_video = is_video_path(path)
         self.file_name.configure(text=os.path.basename(path)[:40])
 
         if self.is_video:
@@ -369,10 +522,10 @@ class NotYUpscalerZAI(ctk.CTk):
 
         if self.is_video:
             self.current_model_dict = VIDEO_MODELS
-            default = "Ultra Native"
+            default = DEFAULT_VIDEO_MODEL
         else:
             self.current_model_dict = IMAGE_MODEL
-            default = "Image Enhance"
+            default = DEFAULT_IMAGE_MODEL
 
         self.model_var.set(default)
         self.model_menu.configure(values=list(self.current_model_dict.keys()))
@@ -384,6 +537,8 @@ class NotYUpscalerZAI(ctk.CTk):
             self.load_image()
 
     def load_image(self):
+        import cv2
+
         frame = cv2.imread(self.current_path)
         if frame is None:
             messagebox.showerror("Error", "Cannot load image")
@@ -398,16 +553,46 @@ class NotYUpscalerZAI(ctk.CTk):
             self.live_update()
 
     def load_video(self):
+        self.stop_playback()
         if self.cap:
             self.cap.release()
-        self.cap = cv2.VideoCapture(self.current_path)
-        if not self.cap.isOpened():
+            self.cap = None
+        self.info_label.configure(text="Reading video…")
+        self.video_request += 1
+        request, path = self.video_request, self.current_path
+        cache_mb = self.config.get("preview_cache_mb", 128)
+
+        def run():
+            # Probed once per file (the export reuses the cached result) and opened
+            # off the Tk thread; the UI is filled in by _video_loaded
+            from core.frame_cache import PreviewFrameSource
+            from core.media_probe import probe_media
+
+            media = probe_media(path)
+            cap = PreviewFrameSource(path, cache_mb=cache_mb, media=media)
+            self.after(0, lambda: self._video_loaded(request, media, cap))
+
+        threading.Thread(target=run, name="probe", daemon=True).start()
+
+    def _video_loaded(self, request, media, cap):
+        if request != self.video_request or not self.is_video:
+            cap.release()  # another file was opened meanwhile
+            return
+        self.cap = cap
+        if media is None or not self.cap.isOpened():
+            self.info_label.configure(text="")
             messagebox.showerror("Error", "Cannot open video")
             return
 
-        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
-        self.video_duration_sec = total_frames / fps if fps > 0 else 0
+        # Keyframe positions decide between seeking and reading forward while scrubbing
+        threading.Thread(target=self.cap.load_keyframes, args=(media,), daemon=True).start()
+
+        total_frames = self.cap.frame_count
+        fps = self.cap.fps
+        self.video_duration_sec = media.duration or (total_frames / fps if fps > 0 else 0)
+        target_w, target_h = self.calculate_size(media.width, media.height)
+        self.info_label.configure(text=f"{media.width}×{media.height}  →  {target_w}×{target_h}  •  {fps:.2f} fps  •  "
+                                       f"{int(self.video_duration_sec // 60)}:{int(self.video_duration_sec % 60):02d}")
 
         self.timeline.configure(from_=0, to=max(total_frames-1, 1))
         self.timeline.set(0)
@@ -421,80 +606,144 @@ class NotYUpscalerZAI(ctk.CTk):
         if not self.cap or not self.cap.isOpened():
             return
         pos = int(self.timeline.get())
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, pos)
-        ret, frame = self.cap.read()
-        if ret:
+        frame = self.cap.get(pos)
+        if frame is not None:
             self.current_frame_bgr = frame
             self.show_frame(frame, self.orig_label)
-            if not self.playing and self.live_enabled:
+            if self.live_enabled:
                 self.live_update()
-        if self.playing:
-            self.after(33, self.update_video_frame)
 
     def show_frame(self, bgr, label):
         if bgr is None:
             return
+        from core.preview import LetterboxCanvas
+
         try:
-            rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-            pil = Image.fromarray(rgb)
-            w, h = pil.size
-            max_w, max_h = 680, 460
-            ratio = min(max_w / w, max_h / h)
-            new_size = (int(w * ratio), int(h * ratio))
-            resized = pil.resize(new_size, Image.LANCZOS)
-            bg = Image.new('RGB', (max_w, max_h), (13, 17, 23))
-            bg.paste(resized, ((max_w - new_size[0]) // 2, (max_h - new_size[1]) // 2))
-            cimg = ctk.CTkImage(bg, size=(680, 460))
-
-            if label == self.enh_label:
-                self.current_enh_image = cimg
-                self.current_enh_preview = cimg
+            t = time.perf_counter()
+            canvas = self.preview_canvases.get(label)
+            if canvas is None:
+                scaling = ctk.ScalingTracker.get_widget_scaling(label)
+                canvas = LetterboxCanvas(int(680 * scaling), int(460 * scaling), (13, 17, 23))
+                self.preview_canvases[label] = canvas
+            rgb = Image.fromarray(canvas.render(bgr))
+
+            photo = self.preview_photos.get(label)
+            if photo is None:
+                photo = self.preview_photos[label] = ImageTk.PhotoImage(rgb)
+                label.configure(image=photo, text="")
             else:
-                self.current_orig_preview = cimg
-
-            label.configure(image=cimg, text="")
+                photo.paste(rgb)
+
+            ms = (time.perf_counter() - t) * 1000
+            self.render_ms = ms if not self.render_ms else self.render_ms * 0.9 + ms * 0.1
+            if t - self.last_render_report >= 0.25:
+                self.last_render_report = t
+                text = f"Render {ms:.1f} ms (avg {self.render_ms:.1f})"
+                timings = self.current_model.timings if self.current_model else None
+                if timings and label is self.enh_label:
+                    text += f" • {timings.short()}"
+                self.render_label.configure(text=text)
         except Exception as e:
             print("show_frame error:", str(e))
 
     def toggle_play(self):
-        if not self.is_video:
+        if not self.is_video or not self.cap:
             return
-        self.playing = not self.playing
-        self.play_btn.configure(text="❚❚ Pause" if self.playing else "▶ Play")
         if self.playing:
-            self.update_video_frame()
+            self.stop_playback()
+        else:
+            self.start_playback(int(self.timeline.get()))
+
+    def start_playback(self, start):
+        if self.playback:
+            self.playback.stop()
+        if start >= self.cap.frame_count - 1:
+            start = 0
+        self.playing = True
+        self.play_btn.configure(text="❚❚ Pause")
+        from core.playback import PlaybackEngine
+
+        self.playback = PlaybackEngine(self.current_path, self.cap.fps, self.cap.preview_size, start=start)
+        self._playback_tick(self.playback)
+
+    def stop_playback(self):
+        engine, self.playback = self.playback, None
+        self.playing = False
+        if engine:
+            engine.stop()
+            self._report_playback(engine)
+        self.play_btn.configure(text="▶ Play")
+
+    def _report_playback(self, engine):
+        self.playback_label.configure(text=f"{engine.shown} shown • {engine.dropped} dropped")
+
+    def _playback_tick(self, engine):
+        # Tk-thread consumer: show whichever frame the clock says is due, then
+        # sleep until the next one. Stale ticks from a stopped engine just exit.
+        if engine is not self.playback:
+            return
+        item = engine.poll()
+        if item is not None:
+            n, frame = item
+            self.current_frame_bgr = frame
+            self.show_frame(frame, self.orig_label)
+            self.timeline.set(n)
+            if engine.shown % 15 == 0:
+                self._report_playback(engine)
+        if engine.finished:
+            self.stop_playback()
+            return
+        self.after(engine.next_delay_ms(), lambda: self._playback_tick(engine))
 
     def on_timeline_change(self, val):
-        if self.is_video:
+        if not self.is_video:
+            return
+        if self.playing:
+            self.start_playback(int(val))
+        else:
             self.update_video_frame()
 
     def live_update(self, val=None):
+        # Runs on the Tk thread: only snapshot the inputs and hand them to the worker
         if not self.live_enabled or self.current_frame_bgr is None:
             return
-
-        current_time = time.time()
-        if current_time - self.last_preview_time < 0.15:
-            return
-        self.last_preview_time = current_time
-
-        try:
-            sharpen = self.sharpen_s.get() if self.is_video else 0
-
-            # Safe unsharp mask – no anchor/ksize issues
-            if sharpen > 0.1:
-                sigma = 1.0 + sharpen * 1.5          #  ~1.0 – 7.0 range
-                blurred = cv2.GaussianBlur(self.current_frame_bgr, (0, 0), sigma)
-                enhanced = cv2.addWeighted(
-                    self.current_frame_bgr, 1.0 + sharpen * 1.2,
-                    blurred,              -sharpen * 1.2,
-                    0
-                )
-            else:
-                enhanced = self.current_frame_bgr.copy()
-
+        if self.is_video and self.cap:
+            src_size = (self.cap.width, self.cap.height)
+        else:
+            src_size = (self.current_frame_bgr.shape[1], self.current_frame_bgr.shape[0])
+        if self.preview_worker is None:
+            from core.preview import PreviewWorker
+            self.preview_worker = PreviewWorker(self.render_preview, self.deliver_preview)
+        self.preview_worker.post({
+            "frame": self.current_frame_bgr,
+            "model": self.current_model,
+            "src_size": src_size,
+            "target_size": self.calculate_size(*src_size),
+        })
+
+    def render_preview(self, job):
+        # Preview worker thread: the export pipeline on a proxy frame, with each
+        # stage's filter sizes scaled from the resolution it runs at in the export
+        from core.planner import StagePlan
+        from core.preview import make_proxy
+
+        frame = make_proxy(job["frame"])
+        model = job["model"]
+        if model is None:
+            return frame.copy()
+        pw = frame.shape[1]
+        model.reset_temporal()  # a single still: temporal models fall back to per-frame denoising
+        # Pre-scale stages run at the source size when upscaling, at the target size when downscaling
+        pre_w = StagePlan(model, job["src_size"], job["target_size"]).pre_size[0]
+        frame = model.scaled(pw / pre_w).pre_scale(frame)
+        return model.scaled(pw / job["target_size"][0]).post_scale(frame)
+
+    def deliver_preview(self, job, enhanced):
+        self.after(0, lambda: self._show_preview(enhanced))
+
+    def _show_preview(self, enhanced):
+        if self.live_enabled:
             self.show_frame(enhanced, self.enh_label)
-        except Exception as e:
-            print("Live preview error:", str(e))
 
     def toggle_live_preview(self):
         self.live_enabled = not self.live_enabled
@@ -507,224 +756,138 @@ class NotYUpscalerZAI(ctk.CTk):
         else:
             try:
                 self.enh_label.configure(text="Live preview disabled", image="")
-                self.current_enh_image = None
+                self.preview_photos.pop(self.enh_label, None)
             except Exception:
                 pass
 
+    def export_settings(self):
+        return ExportSettings(
+            model=self.model_var.get(), target=self.target_var.get(), bitrate=self.bitrate_s.get(),
+            fmt=self.format_var.get(), sharpen=self.sharpen_value(), workers=int(self.workers_var.get()),
+            memory_budget_mb=self.config.get("memory_budget_mb"),
+            output_folder=self.output_folder, segments=self.config.get("segments", 0),
+            timing=self.config.get("stage_timing", False), temporal=self.temporal_frames(),
+            skip_threshold=SKIP_THRESHOLDS.get(self.config.get("skip_unchanged"), 0),
+            engine=ENGINES.get(self.config.get("engine"), "python")
+        )
+
     def start_export(self):
-        if self.export_running:
-            messagebox.showwarning("Busy", "Export already running.")
-            return
         if not self.current_path:
             messagebox.showwarning("No file", "Select a file first.")
             return
-        if self.current_model is None:
-            messagebox.showwarning("Model error", "Model failed to load.")
-            return
-
-        self.disable_ui()
-        self.export_running = True
-        self.export_cancel_requested = False
-        self.export_btn.configure(state="disabled", text="Exporting...", fg_color="#444c56")
-        self.progress_bar.pack(pady=12, padx=24)
-        self.progress_bar.set(0)
-        self.progress_label.pack(pady=4)
-        self.progress_label.configure(text="0%")
-        self.cancel_btn.pack(pady=8, padx=24, fill="x")
-        self.status.configure(text="Starting export...")
-
-        threading.Thread(target=self.export_thread, daemon=True).start()
-
-    def disable_ui(self):
-        widgets = [
-            self.select_btn, self.output_btn, self.model_menu, self.target_menu,
-            self.format_menu, self.sharpen_s if self.is_video else None, self.bitrate_s if self.is_video else None,
-            self.play_btn, self.timeline, self.preview_toggle_btn, self.export_btn
-        ]
-        for w in widgets:
-            if w and w.winfo_exists():
-                w.configure(state="disabled")
-
-    def enable_ui(self):
-        widgets = [
-            self.select_btn, self.output_btn, self.model_menu, self.target_menu,
-            self.format_menu, self.sharpen_s if self.is_video else None, self.bitrate_s if self.is_video else None,
-            self.play_btn, self.timeline, self.preview_toggle_btn, self.export_btn
-        ]
-        for w in widgets:
-            if w and w.winfo_exists():
-                w.configure(state="normal")
-
-    def export_thread(self):
-        out_path = self.get_output_path(self.current_path)
-        error_msg = None
-
-        try:
-            ffmpeg_path = get_ffmpeg_path()
-
-            if not self.is_video:
-                img = cv2.imread(self.current_path)
-                if img is None:
-                    raise ValueError("Cannot read image")
-                h, w = img.shape[:2]
-                nw, nh = self.calculate_size(w, h)
-                up = cv2.resize(img, (nw, nh), cv2.INTER_LANCZOS4)
-                enhanced = self.current_model.enhance_frame(up)
-                cv2.imwrite(out_path, enhanced, [int(cv2.IMWRITE_JPEG_QUALITY), 92])
-                self.after(0, lambda: self._update_progress(100))
-            else:
-                probe = get_ffprobe_path()
-                audio_bitrate = "192k"
-                if probe:
-                    try:
-                        cmd = [probe, "-v", "error", "-select_streams", "a:0",
-                               "-show_entries", "stream=bit_rate", "-of", "default=noprint_wrappers=1:nokey=1",
-                               self.current_path]
-                        abr = subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode().strip()
-                        if abr.isdigit():
-                            audio_bitrate = f"{int(abr)//1000}k"
-                    except:
-                        pass
-
-                cap = cv2.VideoCapture(self.current_path)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                cap.release()
-
-                nw, nh = self.calculate_size(w, h)
-
-                # Auto preset based on bitrate
-                bitrate_mbps = self.bitrate_s.get()
-                if bitrate_mbps <= 8:
-                    preset = "veryfast"
-                elif bitrate_mbps <= 15:
-                    preset = "faster"
-                elif bitrate_mbps <= 25:
-                    preset = "fast"
-                elif bitrate_mbps <= 40:
-                    preset = "medium"
-                else:
-                    preset = "slow"
-
-                sharpen = min(max(self.sharpen_s.get(), 0.5), 3.0)
-                vf = f"scale={nw}:{nh}:flags=lanczos,unsharp=5:5:{sharpen*1.2}"
-
-                video_bitrate = f"{int(bitrate_mbps * 1000)}k"
-                maxrate      = f"{int(bitrate_mbps * 1.5 * 1000)}k"
-                bufsize      = f"{int(bitrate_mbps * 2 * 1000)}k"
-
-                fmt = self.format_var.get()
-                fc = FORMAT_CODECS.get(fmt, FORMAT_CODECS["mp4"])
-                audio_b = fc.get("audio_b", audio_bitrate)
-
-                cmd = [
-                    ffmpeg_path, "-i", self.current_path,
-                    "-vf", vf,
-                    "-c:v", fc["c_v"],
-                    "-preset", preset,
-                    "-b:v", video_bitrate,
-                    "-maxrate", maxrate,
-                    "-bufsize", bufsize,
-                    "-c:a", fc["c_a"],
-                    "-b:a", audio_b,
-                    "-pix_fmt", "yuv420p",
-                    "-map", "0",
-                ]
-
-                if fc.get("f"):
-                    cmd += ["-f", fc["f"]]
-                if fc.get("movflags"):
-                    cmd += ["-movflags", fc["movflags"]]
-
-                cmd += ["-y", out_path]
-
-                startupinfo = None
-                if os.name == 'nt':
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    startupinfo.wShowWindow = subprocess.SW_HIDE
-
-                self.export_process = subprocess.Popen(
-                    cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                    text=True, bufsize=1, startupinfo=startupinfo, universal_newlines=True
-                )
-
-                last_frame = 0
-                while self.export_process.poll() is None:
-                    if self.export_cancel_requested:
-                        self.export_process.terminate()
-                        self.export_process.wait(timeout=6)
-                        if os.path.exists(out_path):
-                            try:
-                                os.remove(out_path)
-                            except:
-                                pass
-                        self.after(0, lambda: messagebox.showinfo("Cancelled", "Export cancelled."))
-                        break
-
-                    for _ in range(20):
-                        line = self.export_process.stderr.readline()
-                        if not line:
-                            break
-                        if "frame=" in line:
-                            try:
-                                m = re.search(r'frame=\s*(\d+)', line)
-                                if m:
-                                    frame = int(m.group(1))
-                                    if frame > last_frame:
-                                        last_frame = frame
-                                        percent = min(100, int((frame / total_frames) * 100))
-                                        self.after(0, lambda p=percent: self._update_progress(p))
-                            except:
-                                pass
-
-                    time.sleep(0.07)
-
-                if self.export_process.returncode != 0 and not self.export_cancel_requested:
-                    err = self.export_process.stderr.read(2048)
-                    error_msg = f"FFmpeg failed (code {self.export_process.returncode})\n{err}"
-                    raise RuntimeError(error_msg)
-
-                if not self.export_cancel_requested:
-                    self.after(0, lambda: self._update_progress(100))
-                    self.after(0, lambda: messagebox.showinfo("Success", f"Saved to:\n{out_path}"))
-
-        except Exception as e:
-            error_msg = str(e)
-            self.after(0, lambda msg=error_msg: messagebox.showerror("Export Failed", msg))
-        finally:
-            self.after(0, self._finish_export_ui)
-
-    def _update_progress(self, percent):
-        if self.progress_bar and self.progress_bar.winfo_exists():
-            self.progress_bar.set(percent / 100.0)
-            self.progress_label.configure(text=f"{percent}%")
-
-    def _finish_export_ui(self):
-        self.export_running = False
-        self.export_cancel_requested = False
-        self.export_process = None
-        self.export_btn.configure(state="normal", text="Export", fg_color="#1e88e5")
-        self.progress_bar.pack_forget()
-        self.progress_label.pack_forget()
-        self.cancel_btn.pack_forget()
-        self.status.configure(text="Export finished" if not self.export_cancel_requested else "Cancelled")
-        self.enable_ui()
-
-    def cancel_export(self):
-        if not self.export_running or not self.export_process:
-            return
-        self.export_cancel_requested = True
-        self.status.configure(text="Cancelling...", text_color=self.danger)
-        self.progress_label.configure(text="Cancelling...")
+        self.job_queue.add(self.current_path, self.export_settings())
+        self.status.configure(text=f"Queued {os.path.basename(self.current_path)}", text_color=self.accent)
+
+    def add_files_to_queue(self):
+        paths = filedialog.askopenfilenames(filetypes=[("Media","*.jpg *.jpeg *.png *.webp *.mp4 *.mkv *.avi *.mov")])
+        settings = self.export_settings()
+        for path in paths:
+            if is_media_path(path):
+                self.job_queue.add(path, settings)
+
+    def toggle_queue_pause(self):
+        if self.job_queue.paused:
+            self.job_queue.resume()
+        else:
+            self.job_queue.pause()
+
+    def on_queue_change(self, entry):
+        # Called from export threads: coalesce bursts of progress into one UI refresh
+        if not self.queue_refresh_pending:
+            self.queue_refresh_pending = True
+            self.after(100, self.refresh_queue)
+
+    def _make_queue_row(self, entry):
+        frame = ctk.CTkFrame(self.queue_frame, fg_color="#1e1e2e", corner_radius=6)
+        frame.pack(fill="x", pady=3)
+        head = ctk.CTkFrame(frame, fg_color="transparent")
+        head.pack(fill="x", padx=8, pady=(6,0))
+        ctk.CTkLabel(head, text=entry.name[:30], font=ctk.CTkFont(size=13), anchor="w").pack(side="left")
+        btn = ctk.CTkButton(head, text="Cancel", width=64, height=24, fg_color="#2a2f38", hover_color=self.danger,
+                            command=lambda: self.on_queue_action(entry.id))
+        btn.pack(side="right")
+        bar = ctk.CTkProgressBar(frame, height=10, mode="determinate", fg_color="#2a2f38", progress_color=self.success)
+        bar.pack(fill="x", padx=8, pady=4)
+        status = ctk.CTkLabel(frame, text="", font=ctk.CTkFont(size=12), text_color="gray", anchor="w")
+        status.pack(fill="x", padx=8, pady=(0,6))
+        row = self.queue_rows[entry.id] = {"frame": frame, "bar": bar, "status": status, "btn": btn, "last": entry.status}
+        return row
+
+    def _queue_status_text(self, e):
+        if e.status == RUNNING:
+            if not e.done:
+                return "Starting..."
+            pct = f"{int(e.progress * 100)}% • " if e.total else ""
+            text = f"{pct}{e.fps:.1f} fps"
+            job = e.job
+            p = job.progress if job else None
+            if p and p.updated:
+                if p.speed:
+                    text += f" • {p.speed:.2f}x"
+                if p.bitrate:
+                    text += f" • {p.bitrate / 1000:.1f} Mb/s"
+            if e.total and e.fps:
+                text += f" • ETA {format_eta((e.total - e.done) / e.fps)}"
+            return text
+        if e.status == DONE:
+            text = f"Done • {e.fps:.1f} fps" if e.fps else "Done"
+            if e.skipped:
+                text += f" • {e.skipped} unchanged frames reused"
+            return text
+        if e.status == FAILED:
+            return "Failed: " + (e.error or "").split("\n")[0][:60]
+        return e.status.capitalize()
+
+    def on_queue_action(self, entry_id):
+        entry = self.job_queue.get(entry_id)
+        if entry and entry.finished:
+            self.job_queue.remove(entry_id)
+        elif entry:
+            self.job_queue.cancel(entry_id)
+
+    def refresh_queue(self):
+        self.queue_refresh_pending = False
+        entries = list(self.job_queue.entries)
+        ids = {e.id for e in entries}
+        for entry_id in list(self.queue_rows):
+            if entry_id not in ids:
+                self.queue_rows.pop(entry_id)["frame"].destroy()
+
+        for e in entries:
+            row = self.queue_rows.get(e.id) or self._make_queue_row(e)
+            row["bar"].set(e.progress)
+            color = {DONE: self.success, FAILED: self.danger, RUNNING: self.accent}.get(e.status, "gray")
+            row["status"].configure(text=self._queue_status_text(e), text_color=color)
+            row["btn"].configure(text="Remove" if e.finished else "Cancel")
+            if row["last"] != e.status:
+                row["last"] = e.status
+                if e.status == DONE:
+                    text = f"Saved {os.path.basename(e.out_path or e.path)}"
+                    if e.stage_summary:
+                        text += f"\n{e.stage_summary}"
+                    self.status.configure(text=text, text_color=self.success)
+                elif e.status == FAILED:
+                    messagebox.showerror("Export Failed", f"{e.name}\n{e.error}")
+
+        c = self.job_queue.counts()
+        summary = f"{c[RUNNING]} running • {c[QUEUED]} queued • {c[DONE]} done"
+        if c[FAILED]:
+            summary += f" • {c[FAILED]} failed"
+        if self.job_queue.paused:
+            summary += " • paused"
+        self.queue_summary.configure(text=summary if entries else "Empty")
+        self.pause_btn.configure(text="Resume" if self.job_queue.paused else "Pause")
+
+    def on_close(self):
+        # Running exports are cancelled and stay queued for the next launch
+        self.stop_playback()
+        if self.preview_worker:
+            self.preview_worker.stop()
+        self.job_queue.shutdown()
+        self.destroy()
 
     def calculate_size(self, w, h):
-        t = self.target_var.get()
-        targets = {"Fit 2K": (2560,1440), "Fit 3K": (2880,1620), "Fit 4K": (3840,2160)}
-        tw, th = targets.get(t, (3840,2160))
-        scale = min(tw / w, th / h)
-        return int(w * scale // 2 * 2), int(h * scale // 2 * 2)
+        return calculate_size(w, h, self.target_var.get())
 
     def open_in_system_player(self):
         if self.current_path and os.path.exists(self.current_path):
@@ -739,17 +902,7 @@ class NotYUpscalerZAI(ctk.CTk):
             self.output_folder = folder
             self.output_status.configure(text=f"Output: {os.path.basename(folder)}", text_color=self.accent)
 
-    def get_output_path(self, input_path):
-        base, _ = os.path.splitext(os.path.basename(input_path))
-        if self.is_video:
-            ext = f".{self.format_var.get()}"
-        else:
-            ext = os.path.splitext(input_path)[1]
-        filename = f"{base}_enhanced{ext}"
-        if self.output_folder and os.path.isdir(self.output_folder):
-            return os.path.join(self.output_folder, filename)
-        return os.path.join(os.path.dirname(input_path), filename)
-
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = NotYUpscalerZAI()
     app.mainloop()
\ No newline at end of file
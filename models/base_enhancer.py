@@ -1,36 +1,391 @@
+import bisect
+import copy
+import threading
+import time
+from functools import lru_cache
+
 import cv2
 import numpy as np
 
+def gaussian_radius(sigma):
+    # Radius of the kernel OpenCV builds for 8-bit input when ksize=(0,0)
+    return int(round(sigma * 3 * 2 + 1)) // 2
+
+def nlm_radius(template, search):
+    return search // 2 + template // 2
+
+@lru_cache(maxsize=64)
+def sharpen_kernel(sharpen):
+    kernel = np.array([[-1,-1,-1], [-1, 1 + sharpen*9, -1], [-1,-1,-1]], dtype=np.float32) / (sharpen*9 + 1)
+    kernel.setflags(write=False)
+    return kernel
+
+@lru_cache(maxsize=64)
+def tone_kernel(contrast, sharpen):
+    # Contrast is linear, so it folds into the sharpen kernel: one 3x3 pass does both
+    kernel = sharpen_kernel(sharpen) * np.float32(contrast)
+    kernel.setflags(write=False)
+    return kernel
+
+# Colour adjustments on 8-bit frames are table lookups; tables are built
+# once per parameter value and shared
+
+@lru_cache(maxsize=64)
+def contrast_lut(contrast):
+    # Built by convertScaleAbs itself, so rounding and saturation match it exactly
+    lut = cv2.convertScaleAbs(np.arange(256, dtype=np.uint8), alpha=contrast).ravel()
+    lut.setflags(write=False)
+    return lut
+
+@lru_cache(maxsize=64)
+def saturation_lut(saturation):
+    # For YCrCb frames: luma kept, both chroma channels scaled around neutral grey
+    chroma = np.clip(np.rint(128 + (np.arange(256) - 128) * saturation), 0, 255).astype(np.uint8)
+    lut = np.stack([np.arange(256, dtype=np.uint8), chroma, chroma], axis=-1).reshape(1, 256, 3)
+    lut.setflags(write=False)
+    return lut
+
+# Where resampling sits in process(): whichever order runs the stages on fewer pixels
+UPSCALE, DOWNSCALE, NATIVE = "upscale", "downscale", "native"
+
+def scale_order(in_size, out_size):
+    # upscale: pre-scale stages at the source size, Lanczos up, post-scale at the target
+    # downscale: area-resample first, then every stage at the smaller target size
+    # native: no resampling at all
+    if tuple(in_size) == tuple(out_size):
+        return NATIVE
+    if out_size[0] * out_size[1] < in_size[0] * in_size[1]:
+        return DOWNSCALE
+    return UPSCALE
+
+class StageTimings:
+    # Wall time per named stage, as running totals plus a log-scale histogram.
+    # Thread-safe; a copy pickled into a worker process starts empty and its
+    # numbers come back through merge().
+    BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def _entry(self, name):
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = {"count": 0, "total": 0.0, "max": 0.0,
+                                         "hist": [0] * (len(self.BUCKETS_MS) + 1)}
+        return entry
+
+    def record(self, name, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            e = self._entry(name)
+            e["count"] += 1
+            e["total"] += ms
+            e["max"] = max(e["max"], ms)
+            e["hist"][bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+
+    def merge(self, other):
+        stages = other.to_dict() if isinstance(other, StageTimings) else other
+        with self._lock:
+            for name, o in stages.items():
+                e = self._entry(name)
+                e["count"] += o["count"]
+                e["total"] += o["total"]
+                e["max"] = max(e["max"], o["max"])
+                e["hist"] = [a + b for a, b in zip(e["hist"], o["hist"])]
+
+    def to_dict(self):
+        with self._lock:
+            return {name: dict(e, hist=list(e["hist"])) for name, e in self.stages.items()}
+
+    def percentile(self, name, q):
+        # Upper bound of the histogram bucket holding the q-th percentile
+        e = self.stages[name]
+        rank, seen = q / 100 * e["count"], 0
+        for bound, n in zip(self.BUCKETS_MS + (e["max"],), e["hist"]):
+            seen += n
+            if seen >= rank and n:
+                return min(bound, e["max"])
+        return e["max"]
+
+    def summary(self):
+        # One line per stage, slowest first
+        stages = self.to_dict()
+        grand = sum(e["total"] for e in stages.values()) or 1
+        lines = []
+        for name, e in sorted(stages.items(), key=lambda kv: -kv[1]["total"]):
+            mean = e["total"] / e["count"] if e["count"] else 0
+            p90 = self.percentile(name, 90)
+            lines.append(f"{name}: {e['total'] / grand * 100:.0f}% • {mean:.1f} ms avg • "
+                         f"p90 <{p90:.{1 if p90 < 10 else 0}f} ms • max {e['max']:.0f} ms • n={e['count']}")
+        return lines
+
+    def short(self, limit=3):
+        stages = self.to_dict()
+        top = sorted(stages.items(), key=lambda kv: -kv[1]["total"])[:limit]
+        return " • ".join(f"{name} {e['total'] / e['count']:.0f} ms" for name, e in top if e["count"])
+
+
+class FrameRing:
+    # The last `size` frames seen, copied into buffers that are allocated once
+    def __init__(self, size):
+        self.size = size
+        self._bufs = []
+        self._next = 0
+
+    def __len__(self):
+        return len(self._bufs)
+
+    def clear(self):
+        self._bufs = []
+        self._next = 0
+
+    def push(self, frame):
+        if self._bufs and self._bufs[0].shape != frame.shape:
+            self.clear()
+        if len(self._bufs) < self.size:
+            self._bufs.append(frame.copy())
+        elif self.size:
+            np.copyto(self._bufs[self._next], frame)
+            self._next = (self._next + 1) % self.size
+
+    def frames(self):
+        # Oldest first
+        return self._bufs[self._next:] + self._bufs[:self._next]
+
+
 class BaseEnhancer:
-    def __init__(self, sharpen=1.8, contrast=1.25, saturation=1.15, glow=0.4):
+    # Registry metadata (models.registry): display name, whether it is a video
+    # model, constructor parameters that change its output, frame time
+    # relative to Lite Restore and peak working memory per output megapixel
+    # on top of the frames themselves (bench_models, 1080p)
+    NAME = None
+    VIDEO = True
+    PARAMS = ("sharpen", "temporal")
+    COST = 1.0
+    MEMORY_MB_PER_MP = 24
+    # Scratch buffers kept per thread; several shapes are live when tiling
+    SCRATCH_BUFFERS = 24
+    GLOW_SIGMA = 18
+    # Temporal mode: one multi-frame NLM pass replaces the per-frame ones. The
+    # previous frames make up for a search window less than half the size.
+    NLM_STAGES = ("denoise", "denoise_strong")
+    TEMPORAL_H = 8
+    TEMPORAL_SEARCH = 9
+
+    def __init__(self, sharpen=1.8, contrast=1.25, saturation=1.15, glow=0.4, temporal=0):
         self.sharpen = sharpen
         self.contrast = contrast
         self.saturation = saturation
         self.glow = glow
+        # Previous frames the temporal denoiser looks at; 0 denoises every frame on its own
+        self.temporal = temporal
+        # Size of the frames this instance sees relative to the export resolution;
+        # spatial filter parameters are scaled by it (preview runs on a proxy)
+        self.scale = 1.0
+        # StageTimings while instrumentation is on; None keeps the stage loop untimed
+        self.timings = None
+        self._local = threading.local()
 
-    def enhance_frame(self, frame):
-        if frame is None or frame.size == 0:
-            return frame
+    def enable_timing(self):
+        if self.timings is None:
+            self.timings = StageTimings()
+        return self.timings
 
-        try:
-            frame = cv2.fastNlMeansDenoisingColored(frame, None, 8, 8, 7, 21)
-        except:
-            pass
+    def disable_timing(self):
+        self.timings = None
+
+    def scaled(self, scale):
+        clone = copy.copy(self)
+        clone.scale = scale
+        return clone
+
+    def _win(self, size):
+        # Odd filter window scaled to the working resolution
+        return max(3, int(round(size * self.scale))) | 1
+
+    def _sigma(self, sigma):
+        return max(0.5, sigma * self.scale)
+
+    def __getstate__(self):
+        # Scratch buffers stay behind when the enhancer is sent to a worker process
+        state = self.__dict__.copy()
+        state.pop("_local", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _scratch(self, key, shape, dtype=np.uint8):
+        bufs = getattr(self._local, "bufs", None)
+        if bufs is None:
+            bufs = self._local.bufs = {}
+        k = (key, shape, dtype)
+        buf = bufs.get(k)
+        if buf is None:
+            if len(bufs) >= self.SCRATCH_BUFFERS:
+                bufs.pop(next(iter(bufs)))
+            buf = bufs[k] = np.empty(shape, dtype)
+        return buf
+
+    def _is_scratch(self, frame):
+        bufs = getattr(self._local, "bufs", None) or {}
+        return any(frame is buf for buf in bufs.values())
+
+    # Stages are (name, fn, halo) tuples. `halo` is how many pixels of
+    # neighbourhood the stage reads around each output pixel, or None when
+    # the stage depends on the whole frame and cannot be tiled.
+    def pre_scale_stages(self):
+        # Noise removal: run at the smallest resolution the frame passes through
+        return [("denoise", self._denoise, nlm_radius(self._win(7), self._win(21)))]
+
+    def post_scale_stages(self):
+        # Tone and detail: run at the output resolution with a single rounding at the end
+        halo = 1 + (gaussian_radius(self._sigma(self.GLOW_SIGMA)) if self.glow > 0 else 0)
+        return [("tone", self._tone, halo)] + self.saturation_stages()
+
+    def saturation_stages(self):
+        if self.saturation == 1:
+            return []
+        return [("saturation", self._saturate, 0)]
+
+    def temporal_stages(self, stages):
+        # The history is of whole decoded frames, so the temporal pass runs first and is never tiled
+        if not self.temporal:
+            return stages
+        kept = [s for s in stages if s[0] not in self.NLM_STAGES]
+        return [("temporal_denoise", self._temporal_denoise, None)] + kept
+
+    def _ring(self):
+        ring = getattr(self._local, "ring", None)
+        if ring is None or ring.size != self.temporal:
+            ring = self._local.ring = FrameRing(self.temporal)
+        return ring
+
+    def reset_temporal(self):
+        # New stream or a seek: the next frame has no history
+        self._ring().clear()
+
+    def prime_temporal(self, frames, size=None):
+        # History for a frame processed away from its neighbours (worker processes).
+        # Source frames headed for `size` are area-downscaled first, as process()
+        # does before the temporal pass, so the ring holds what it would have seen.
+        ring = self._ring()
+        ring.clear()
+        for frame in frames:
+            if size is not None and scale_order((frame.shape[1], frame.shape[0]), size) == DOWNSCALE:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            ring.push(frame)
 
+    def _temporal_denoise(self, frame):
+        ring = self._ring()
+        past = [f for f in ring.frames() if f.shape == frame.shape]
+        h = self.TEMPORAL_H
+        if past:
+            # Causal window: the past frames mirrored around the current one, so output is never delayed
+            k = len(past)
+            out = cv2.fastNlMeansDenoisingColoredMulti(past + [frame] + past[::-1], k, 2 * k + 1, None, h, h,
+                                                       self._win(7), self._win(self.TEMPORAL_SEARCH))
+        else:
+            out = cv2.fastNlMeansDenoisingColored(frame, None, h, h, self._win(7), self._win(21))
+        ring.push(frame)
+        return out
+
+    def _denoise(self, frame):
         try:
-            frame = cv2.convertScaleAbs(frame, alpha=self.contrast, beta=0)
+            return cv2.fastNlMeansDenoisingColored(frame, None, 8, 8, self._win(7), self._win(21))
         except:
-            pass
+            return frame
 
-        kernel = np.array([[-1,-1,-1], [-1, 1 + self.sharpen*9, -1], [-1,-1,-1]], dtype=np.float32) / (self.sharpen*9 + 1)
-        frame = cv2.filter2D(frame, -1, kernel)
+    def _tone(self, frame):
+        # contrast -> sharpen -> glow, rounded and saturated once. The sharpened
+        # frame stays float32 so nothing clips before the glow is added; the
+        # glow blur runs on its saturated uint8 copy, which OpenCV blurs several
+        # times faster than floats. The copy is rounded from the float result
+        # because filter2D's own uint8 rounding differs at row ends, and tiled
+        # and full-frame passes must agree. Steady-state frames allocate nothing.
+        shape = frame.shape
+        sharp = self._scratch("tone_sharp", shape, np.float32)
+        clipped = self._scratch("tone_clipped", shape, np.float32)
+        out = self._scratch("tone_out", shape)
 
+        cv2.filter2D(frame, cv2.CV_32F, tone_kernel(self.contrast, self.sharpen), dst=sharp)
+        np.maximum(sharp, 0, out=clipped)
+        cv2.convertScaleAbs(clipped, dst=out)  # rounds and saturates to [0, 255]
         if self.glow > 0:
-            blurred = cv2.GaussianBlur(frame, (0,0), 18)
-            frame = cv2.addWeighted(frame, 1.0, blurred, self.glow*0.8, 0)
+            cv2.GaussianBlur(out, (0, 0), self._sigma(self.GLOW_SIGMA), dst=out)  # in place
+            cv2.addWeighted(sharp, 1.0, out, self.glow*0.8, 0, dst=out, dtype=cv2.CV_8U)
+        return out
 
+    def _saturate(self, frame):
+        ycc = self._scratch("sat_ycc", frame.shape)
+        out = self._scratch("sat_out", frame.shape)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2YCrCb, dst=ycc)
+        cv2.LUT(ycc, saturation_lut(self.saturation), dst=ycc)
+        cv2.cvtColor(ycc, cv2.COLOR_YCrCb2BGR, dst=out)
+        return out
+
+    @staticmethod
+    def run_stages(stages, frame, timings=None):
+        if timings is None:
+            for _, fn, _ in stages:
+                frame = fn(frame)
+            return frame
+        for name, fn, _ in stages:
+            t = time.perf_counter()
+            frame = fn(frame)
+            timings.record(name, time.perf_counter() - t)
         return frame
 
+    def _deliver(self, frame, out):
+        # Stages may hand back scratch buffers; never let one escape to the caller
+        if out is not None:
+            np.copyto(out, frame)
+            return out
+        return frame.copy() if self._is_scratch(frame) else frame
+
+    def pre_scale(self, frame, out=None):
+        return self._deliver(self.run_stages(self.pre_scale_stages(), frame, self.timings), out)
+
+    def post_scale(self, frame, out=None):
+        return self._deliver(self.run_stages(self.post_scale_stages(), frame, self.timings), out)
+
+    def enhance_frame(self, frame, out=None):
+        if frame is None or frame.size == 0:
+            return frame
+        frame = self.run_stages(self.pre_scale_stages(), frame, self.timings)
+        return self.post_scale(frame, out)
+
+    def _resize(self, frame, size, interpolation):
+        t = time.perf_counter()
+        w, h = size
+        scaled = self._scratch("resize", (h, w, frame.shape[2]))
+        frame = cv2.resize(frame, (w, h), dst=scaled, interpolation=interpolation)
+        if self.timings is not None:
+            self.timings.record("resize", time.perf_counter() - t)
+        return frame
+
+    def process(self, frame, size, out=None):
+        # Upscaling: denoise at source resolution, Lanczos resize, then sharpen/tone at `size`.
+        # Downscaling: area-resample to `size` first so no stage runs on the larger frame.
+        if frame is None or frame.size == 0:
+            return frame
+        order = scale_order((frame.shape[1], frame.shape[0]), size)
+        if order == DOWNSCALE:
+            frame = self._resize(frame, size, cv2.INTER_AREA)
+        frame = self.run_stages(self.pre_scale_stages(), frame, self.timings)
+        if order == UPSCALE:
+            frame = self._resize(frame, size, cv2.INTER_LANCZOS4)
+        return self.post_scale(frame, out)
+
     def get_ffmpeg_vf(self, tw, th):
-        return (f"scale={tw}:{th}:flags=lanczos,unsharp=7:7:{self.sharpen*1.8},"
-                f"cas=0.9,eq=contrast={self.contrast}:saturation={self.saturation}")
\ No newline at end of file
+        # unsharp rejects amounts above 5
+        return (f"scale={tw}:{th}:flags=lanczos,unsharp=7:7:{min(self.sharpen*1.8, 5):.2f},"
+                f"cas=0.9,eq=contrast={self.contrast}:saturation={self.saturation}")
@@ -1,43 +1,61 @@
 import cv2
 import numpy as np
-from .base_enhancer import BaseEnhancer
+from .base_enhancer import BaseEnhancer, contrast_lut, gaussian_radius, nlm_radius
 
 class ImageEnhanceModel(BaseEnhancer):
+    NAME = "Image Enhance"
+    VIDEO = False
+    PARAMS = ()
+    COST = 0.4
+    MEMORY_MB_PER_MP = 4
+
     def __init__(self, **kwargs):
         # No sharpen parameter needed anymore for pure image enhancement
         super().__init__(contrast=1.18, saturation=1.22, glow=0.0, **kwargs)
 
-    def enhance_frame(self, frame):
-        if frame is None or frame.size == 0:
-            return frame
+    def pre_scale_stages(self):
+        return [
+            ("bilateral", self._bilateral, self._win(7) // 2),
+            ("denoise", self._denoise, nlm_radius(self._win(5), self._win(11))),
+        ]
+
+    def post_scale_stages(self):
+        stages = [("contrast", self._contrast, 0)] + self.saturation_stages()
+        stages.append(("unsharp", self._unsharp, gaussian_radius(self._sigma(1.8))))
+        if self.glow > 0:
+            # CLAHE equalises over the whole frame, so it is never tiled
+            stages.append(("clahe", self._clahe, None))
+        return stages
 
+    def _bilateral(self, frame):
         # Light bilateral filter to reduce noise without losing detail
-        frame = cv2.bilateralFilter(frame, d=7, sigmaColor=45, sigmaSpace=45)
+        return cv2.bilateralFilter(frame, d=self._win(7), sigmaColor=45, sigmaSpace=45 * self.scale)
 
+    def _denoise(self, frame):
         # Subtle denoising (very light to keep natural look)
         try:
-            frame = cv2.fastNlMeansDenoisingColored(frame, None, h=6, hColor=6, templateWindowSize=5, searchWindowSize=11)
+            return cv2.fastNlMeansDenoisingColored(frame, None, h=6, hColor=6, templateWindowSize=self._win(5), searchWindowSize=self._win(11))
         except:
-            pass
+            return frame
 
-        # Apply contrast and saturation from base (controlled values)
-        frame = cv2.convertScaleAbs(frame, alpha=self.contrast, beta=0)
+    def _contrast(self, frame):
+        # Contrast from base (controlled values) as a table lookup
+        return cv2.LUT(frame, contrast_lut(self.contrast))
 
+    def _unsharp(self, frame):
         # Very subtle unsharp mask for edge clarity (no glow/brightness explosion)
-        blurred = cv2.GaussianBlur(frame, (0,0), 1.8)
-        frame = cv2.addWeighted(frame, 1.25, blurred, -0.25, 0)
+        blurred = cv2.GaussianBlur(frame, (0,0), self._sigma(1.8))
+        return cv2.addWeighted(frame, 1.25, blurred, -0.25, 0)
 
+    def _clahe(self, frame):
         # Optional very light glow/highlight recovery (disabled by default)
-        if self.glow > 0:
-            lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            l = clahe.apply(l)
-            lab = cv2.merge((l, a, b))
-            frame = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-
-        return frame
+        lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+        l, a, b = cv2.split(lab)
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        l = clahe.apply(l)
+        lab = cv2.merge((l, a, b))
+        return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
 
     def get_ffmpeg_vf(self, tw, th):
         # For images we don't use FFmpeg, but keep method for consistency
-        return f"scale={tw}:{th}:flags=lanczos"
\ No newline at end of file
+        return f"scale={tw}:{th}:flags=lanczos"
@@ -2,13 +2,17 @@ import cv2
 from .base_enhancer import BaseEnhancer
 
 class LiteRestoreEnhancer(BaseEnhancer):
+    NAME = "Lite Restore"
+
     def __init__(self, sharpen=1.8, **kwargs):
         super().__init__(sharpen=sharpen, **kwargs)
 
-    def enhance_frame(self, frame):
-        frame = cv2.bilateralFilter(frame, 7, 35, 35)
-        return super().enhance_frame(frame)
+    def pre_scale_stages(self):
+        return self.temporal_stages([("bilateral", self._bilateral, self._win(7) // 2)] + super().pre_scale_stages())
+
+    def _bilateral(self, frame):
+        return cv2.bilateralFilter(frame, self._win(7), 35, 35 * self.scale)
 
     def get_ffmpeg_vf(self, tw, th):
         vf = super().get_ffmpeg_vf(tw, th)
-        return f"hqdn3d=3:3:2:2,{vf}"
\ No newline at end of file
+        return f"hqdn3d=3:3:2:2,{vf}"
@@ -1,14 +1,21 @@
 import cv2
-from .base_enhancer import BaseEnhancer
+from .base_enhancer import BaseEnhancer, nlm_radius
 
 class ProDetailEnhancer(BaseEnhancer):
+    NAME = "Pro Detail"
+    COST = 1.9
+    TEMPORAL_H = 10
+
     def __init__(self, sharpen=1.8, **kwargs):
         super().__init__(sharpen=sharpen, **kwargs)
 
-    def enhance_frame(self, frame):
-        frame = cv2.fastNlMeansDenoisingColored(frame, None, 10, 10, 7, 21)
-        return super().enhance_frame(frame)
+    def pre_scale_stages(self):
+        return self.temporal_stages([("denoise_strong", self._denoise_strong, nlm_radius(self._win(7), self._win(21)))]
+                                    + super().pre_scale_stages())
+
+    def _denoise_strong(self, frame):
+        return cv2.fastNlMeansDenoisingColored(frame, None, 10, 10, self._win(7), self._win(21))
 
     def get_ffmpeg_vf(self, tw, th):
         vf = super().get_ffmpeg_vf(tw, th)
-        return f"hqdn3d=4:4:3:3,unsharp=5:5:1.5,{vf}"
\ No newline at end of file
+        return f"hqdn3d=4:4:3:3,unsharp=5:5:1.5,{vf}"
@@ -0,0 +1,113 @@
+import copy
+import importlib
+import inspect
+import os
+import pkgutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .base_enhancer import BaseEnhancer
+
+# Enhancer registry. Every module in this package that defines a
+# BaseEnhancer subclass is a model, listed under its module name (the values
+# of VIDEO_MODELS/IMAGE_MODEL) and its display name. Instances are cached by
+# model and output-changing parameters and prewarmed on a tiny frame, so
+# OpenCV's first-call setup and the kernel/LUT caches are paid when a model
+# is picked rather than on the first preview or export frame.
+#
+# get() returns the shared instance (the app's preview); create() returns a
+# private copy of it for anything that turns on timing or runs alongside the
+# preview (exports, engine comparison).
+
+CACHE_ENTRIES = 16
+WARM_SIZE = (32, 18)  # upscaled 2x, so every stage and both resizes run once
+
+_models = None
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+class ModelInfo:
+    def __init__(self, key, cls):
+        self.key = key
+        self.cls = cls
+        self.name = cls.NAME or key
+        self.video = cls.VIDEO
+        self.params = cls.PARAMS
+        self.cost = cls.COST
+        self.memory_mb_per_mp = cls.MEMORY_MB_PER_MP
+
+    def memory_mb(self, size):
+        # Working memory for one frame at `size`, frames not included
+        return self.memory_mb_per_mp * size[0] * size[1] / 1e6
+
+    def describe(self):
+        return f"{self.cost:.1f}× Lite Restore time • ~{self.memory_mb_per_mp} MB per output megapixel"
+
+
+def discover():
+    # {module name: ModelInfo}, scanned once
+    global _models
+    with _lock:
+        if _models is None:
+            found = {}
+            for mod in pkgutil.iter_modules([os.path.dirname(__file__)]):
+                if mod.name in ("base_enhancer", "registry"):
+                    continue
+                module = importlib.import_module(f"{__package__}.{mod.name}")
+                for _, cls in inspect.getmembers(module, inspect.isclass):
+                    if issubclass(cls, BaseEnhancer) and cls.__module__ == module.__name__:
+                        found[mod.name] = ModelInfo(mod.name, cls)
+                        break
+            _models = found
+        return _models
+
+
+def find(name):
+    models = discover()
+    if name in models:
+        return models[name]
+    for info in models.values():
+        if info.name == name:
+            return info
+    raise KeyError(f"Unknown model: {name}")
+
+
+def prewarm(enhancer):
+    # Warm-up runs are left out of the stage timings and the temporal history
+    w, h = WARM_SIZE
+    frame = np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8)
+    timings, enhancer.timings = enhancer.timings, None
+    try:
+        enhancer.process(frame, (w * 2, h * 2))
+    finally:
+        enhancer.timings = timings
+        enhancer.reset_temporal()
+
+
+def get(name, **params):
+    # Shared, prewarmed instance; parameters the model does not take are ignored
+    info = find(name)
+    kwargs = {k: v for k, v in params.items() if k in info.params}
+    key = (info.key, tuple(sorted(kwargs.items())))
+    with _lock:
+        enhancer = _cache.get(key)
+        if enhancer is not None:
+            _cache.move_to_end(key)
+            return enhancer
+    enhancer = info.cls(**kwargs)
+    prewarm(enhancer)
+    with _lock:
+        enhancer = _cache.setdefault(key, enhancer)
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return enhancer
+
+
+def create(name, **params):
+    # Own instance (fresh scratch buffers, temporal history and timing) of a warm model
+    enhancer = copy.copy(get(name, **params))
+    enhancer.timings = None
+    return enhancer
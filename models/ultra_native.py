@@ -1,19 +1,30 @@
 import cv2
-from .base_enhancer import BaseEnhancer
+from .base_enhancer import BaseEnhancer, gaussian_radius, nlm_radius
 
 class UltraNativeEnhancer(BaseEnhancer):
+    NAME = "Ultra Native"
+    COST = 2.2
+    TEMPORAL_H = 12
+
     def __init__(self, sharpen=1.8, **kwargs):
         super().__init__(sharpen=sharpen, **kwargs)
 
-    def enhance_frame(self, frame):
-        frame = cv2.fastNlMeansDenoisingColored(frame, None, 12, 12, 7, 25)
+    def pre_scale_stages(self):
+        return self.temporal_stages([
+            ("denoise_strong", self._denoise_strong, nlm_radius(self._win(7), self._win(25))),
+            ("edges", self._edges, 1 + gaussian_radius(self._sigma(1.5))),
+        ] + super().pre_scale_stages())
+
+    def _denoise_strong(self, frame):
+        return cv2.fastNlMeansDenoisingColored(frame, None, 12, 12, self._win(7), self._win(25))
+
+    def _edges(self, frame):
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         edges = cv2.Laplacian(gray, cv2.CV_64F)
         edges = cv2.convertScaleAbs(edges)
-        edges = cv2.GaussianBlur(edges, (0,0), 1.5)
-        frame = cv2.addWeighted(frame, 1.0, cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR), 0.55, 0)
-        return super().enhance_frame(frame)
+        edges = cv2.GaussianBlur(edges, (0,0), self._sigma(1.5))
+        return cv2.addWeighted(frame, 1.0, cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR), 0.55, 0)
 
     def get_ffmpeg_vf(self, tw, th):
         vf = super().get_ffmpeg_vf(tw, th)
-        return f"cas=0.95,hqdn3d=5:5:4:4,unsharp=7:7:2.5,{vf}"
\ No newline at end of file
+        return f"cas=0.95,hqdn3d=5:5:4:4,unsharp=7:7:2.5,{vf}"